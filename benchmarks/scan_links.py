@@ -0,0 +1,81 @@
+"""Compares the link scan of ``clean --full-scan`` with a plain ``os.walk``.
+
+A synthetic tree of empty files and dangling links into a separate root is
+created in a temporary directory, and both scans must find the same links.
+
+    python benchmarks/scan_links.py --directories 1000 --files 1000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+# The user interface must be imported before the twigs
+import nest.ui  # noqa: E402, F401
+
+from nest import __main__ as main  # noqa: E402
+
+
+def walk(target: Path, root: Path):
+    """The scan used before :func:`nest.__main__._scan_links`."""
+    files = (
+        Path(directory) / name
+        for directory, _, names in os.walk(target)
+        for name in names
+    )
+    return list(main._links_to(files, root))
+
+
+def scan(target: Path, root: Path):
+    return [
+        (s, t)
+        for (s, t) in main._scan_links(target, main.PRUNE)
+        if t.is_relative_to(root)
+    ]
+
+
+def create(base: Path, directories: int, files: int, links: int):
+    root = base / 'root'
+    target = base / 'target'
+    root.mkdir()
+    for i in range(directories):
+        directory = target / 'd{}'.format(i)
+        directory.mkdir(parents=True)
+        for j in range(files):
+            (directory / 'f{}'.format(j)).touch()
+    for i in range(links):
+        link = target / 'd{}'.format(i % directories) / 'l{}'.format(i)
+        link.symlink_to(root / 'l{}'.format(i))
+    return root, target
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--directories', type=int, default=100)
+    parser.add_argument('--files', type=int, default=1000)
+    parser.add_argument('--links', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as base:
+        root, target = create(
+            Path(base), args.directories, args.files, args.links
+        )
+        results = {}
+        for f in (walk, scan):
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                results[f.__name__] = sorted(f(target, root))
+                print(
+                    '{:5} {:.2f} s'.format(
+                        f.__name__, time.perf_counter() - start
+                    )
+                )
+        assert results['walk'] == results['scan']
+        assert len(results['scan']) == args.links
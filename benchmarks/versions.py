@@ -0,0 +1,112 @@
+"""Compares platforms.Version with the previous tuple of numbers.
+
+Random dotted release numbers are parsed twice, sorted, compared with a
+string and with each other, and collected in a set.
+
+    python benchmarks/versions.py --count 100000
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+# The user interface must be imported before the twigs
+import nest.ui  # noqa: E402, F401
+
+from nest import platforms  # noqa: E402
+from nest.platforms import Version  # noqa: E402
+
+#: The number of times every measurement is repeated; the fastest is shown.
+REPEAT = 5
+
+
+class Reference:
+    """The version used before :class:`nest.platforms.Version` parsed
+    :pep:`440` and semantic versions.
+    """
+
+    def __init__(self, s):
+        if isinstance(s, tuple):
+            self._version = s
+        elif isinstance(s, str):
+            self._version = tuple(int(p) for p in s.split('.'))
+        else:
+            raise ValueError(s)
+
+    def __eq__(self, o):
+        o = o if isinstance(o, self.__class__) else self.__class__(o)
+        return len(self._version) == len(o._version) and all(
+            a == b for (a, b) in zip(self._version, o._version)
+        )
+
+    def __lt__(self, o):
+        o = o if isinstance(o, self.__class__) else self.__class__(o)
+        return self._version < o._version
+
+    def __ge__(self, o):
+        return not self < o
+
+
+def measure(f, setup=lambda: None) -> str:
+    result = None
+    for _ in range(REPEAT):
+        setup()
+        start = time.perf_counter()
+        try:
+            f()
+        except TypeError:
+            return '-'
+        duration = time.perf_counter() - start
+        result = duration if result is None else min(result, duration)
+    return '{:.3f}'.format(result)
+
+
+def run(cls, strings):
+    versions = [cls(s) for s in strings]
+    return {
+        # Parse every string as if for the first time
+        'parse': measure(
+            lambda: [cls(s) for s in strings], platforms._VERSIONS.clear
+        ),
+        'reparse': measure(lambda: [cls(s) for s in strings]),
+        'sort': measure(lambda: sorted(versions)),
+        '>= str': measure(lambda: [v >= '15.50.500' for v in versions]),
+        '==': measure(
+            lambda: [a == b for (a, b) in zip(versions, versions[1:])]
+        ),
+        'set': measure(lambda: set(versions)),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--distinct', type=int, default=None)
+    args = parser.parse_args()
+
+    random.seed(1)
+    distinct = [
+        '{}.{}.{}'.format(
+            random.randrange(30), random.randrange(100), random.randrange(1000)
+        )
+        for _ in range(args.distinct or args.count)
+    ]
+    strings = [random.choice(distinct) for _ in range(args.count)]
+
+    results = {
+        'reference': run(Reference, strings),
+        'Version': run(Version, strings),
+    }
+    print('{:10}'.format('') + ''.join('{:>10}'.format(k) for k in results))
+    for measurement in results['Version']:
+        print(
+            '{:10}'.format(measurement)
+            + ''.join(
+                '{:>10}'.format(r[measurement]) for r in results.values()
+            )
+        )
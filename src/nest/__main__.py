@@ -1,26 +1,58 @@
 import argparse
 import concurrent.futures
+import fnmatch
+import itertools
 import os
 import subprocess
 import sys
+import time
 
 from pathlib import Path
-from typing import Generator, List, Optional, Sequence
+from typing import Any, Dict, Generator, List, Optional, Sequence
 
 from . import (
     ROOT,
     NestException,
     directories,
     platforms,
+    state,
     ui,
 )
 from .twigs import *
-from .twigs import TWIGS, Twig
+from .twigs import TWIGS, Twig, event_loop
 from .twigs.configuration import Configuration
 
 #: The home directory.
 HOME = Path(os.path.expanduser('~/'))
 
+#: The name of the state listing all links created by ``build``.
+LINKS_STATE = 'links'
+
+#: The name of the state listing all twigs installed by ``build``.
+INSTALLED_STATE = 'installed'
+
+#: The name of the state containing the inputs of all successful completers.
+COMPLETERS_STATE = 'completers'
+
+#: The name of the state containing the most recently found updates.
+UPDATES_STATE = 'updates'
+
+#: The name of the state containing the compiled configuration.
+CONFIGURATION_STATE = 'configuration'
+
+#: The age, in seconds, after which found updates for a twig are checked again.
+UPDATES_MAX_AGE = 60 * 60
+
+#: The default patterns for directories skipped by a full scan. A pattern
+#: containing a slash is matched against the path relative to the scanned
+#: directory, and any other pattern against the directory name.
+PRUNE = (
+    '.cache',
+    '.local/share/containers',
+    'node_modules',
+    '.rustup',
+)
+
 
 def initialize(no_environment_header: bool):
     """Loads the configuration and initialises all twigs."""
@@ -37,6 +69,7 @@ def initialize(no_environment_header: bool):
             distribution=distribution,
             python_version=platforms.Version(tuple(sys.version_info[:3])),
             version=version,
+            _cache=CONFIGURATION_STATE,
         )
     except ValueError as e:
         sys.stderr.write('Invalid configuration: {}'.format(e))
@@ -66,9 +99,23 @@ def initialize(no_environment_header: bool):
 
 def build(
     target: Path,
+    purge_all: bool,
 ):
+    git.sync_submodules()
+
+    # Without a record of installed twigs, assume any twig may be installed
+    installed = state.load(INSTALLED_STATE)
+    purge_all = purge_all or installed is None
+    installed = set(installed or [])
+
     with ui.section(ui.bold('Removing disabled twigs'), delay=True):
-        for twig in reversed([t for t in TWIGS if not t.enabled]):
+        for twig in reversed(
+            [
+                t
+                for t in TWIGS
+                if not t.enabled and (purge_all or t.name in installed)
+            ]
+        ):
             twig.remove()
             with ui.section(ui.bold('Unlinking files'), delay=True):
                 for rel in twig.user_files:
@@ -77,8 +124,15 @@ def build(
                     ui.unlink(
                         twig, twig.system_source, twig.system_source.root, rel
                     )
+            installed.discard(twig.name)
+    state.store(INSTALLED_STATE, sorted(installed))
 
     enabled_twigs = [t for t in TWIGS if t.enabled]
+    missing = _preflight(enabled_twigs)
+    if missing:
+        with ui.section(ui.bold('Twigs to install')):
+            ui.log(ui.item(', '.join(t.name for t in missing)))
+
     with ui.section(ui.bold('Installing twigs'), delay=True):
         twig_format = '{{name:{}}} - {{description}}'.format(
             max(len(t.name) for t in TWIGS if t.enabled) + len(ui.bold(''))
@@ -87,40 +141,96 @@ def build(
             max(len(t.name) for t in TWIGS if t.enabled)
         )
 
-        for twig in enabled_twigs:
-            header = twig_format.format(
-                name=ui.bold(twig.name), description=twig.description
-            )
-            header_no_format = twig_format_no_format.format(
-                name=twig.name, description=twig.description
-            )
-            with ui.section(header, length=len(header_no_format)):
-                if not twig.present:
-                    ui.log(ui.installing('Installing twig...'))
-                    twig.install()
-                with ui.section('Linking files', delay=True):
-                    for rel in twig.user_files:
-                        ui.link(twig, twig.user_source, target, rel)
-                    for rel in twig.system_files:
-                        ui.link(
+        done = set()
+        links = set(state.load(LINKS_STATE, []))
+        try:
+            for i, twig in enumerate(enabled_twigs):
+                header = twig_format.format(
+                    name=ui.bold(twig.name), description=twig.description
+                )
+                header_no_format = twig_format_no_format.format(
+                    name=twig.name, description=twig.description
+                )
+                with ui.section(header, length=len(header_no_format)):
+                    if twig.name not in done and not twig.present:
+                        ui.log(ui.installing('Installing twig...'))
+                        batch = twig.install_batch(
+                            [
+                                t
+                                for t in enabled_twigs[i + 1 :]
+                                if t.name not in done
+                                and all(
+                                    d.name in done or not d.enabled
+                                    for d in t.dependencies
+                                )
+                            ]
+                        )
+                        if len(batch) > 1:
+                            ui.log(
+                                ui.item(
+                                    'Installed along with {}'.format(
+                                        ', '.join(t.name for t in batch[1:])
+                                    )
+                                )
+                            )
+                        done.update(t.name for t in batch)
+                    done.add(twig.name)
+                    installed.add(twig.name)
+                    with ui.section('Linking files', delay=True):
+                        ui.link_all(
+                            twig, twig.user_source, target, twig.user_files
+                        )
+                        links.update(
+                            str((target / rel).absolute())
+                            for rel in twig.user_files
+                        )
+                        ui.link_all(
                             twig,
                             twig.system_source,
                             twig.system_source.root,
-                            rel,
+                            twig.system_files,
                         )
+                        links.update(
+                            str((twig.system_source.root / rel).absolute())
+                            for rel in twig.system_files
+                        )
+        finally:
+            # Record the links and twigs even if the build fails part way, so
+            # that they can be removed later
+            state.store(LINKS_STATE, sorted(links))
+            state.store(INSTALLED_STATE, sorted(installed))
 
-        for twig in reversed(enabled_twigs):
-            twig.complete()
+        _complete(enabled_twigs)
 
 
 def clean(
     target: Path,
     force: bool,
+    full_scan: bool,
+    prune: Optional[List[str]],
 ):
+    links = _links_to((Path(p) for p in state.load(LINKS_STATE, [])), ROOT)
+    if full_scan:
+        links = itertools.chain(
+            links,
+            (
+                (s, t)
+                for (s, t) in _scan_links(
+                    target, PRUNE if prune is None else prune
+                )
+                if t.is_relative_to(ROOT)
+            ),
+        )
+    remaining = {}
     with ui.section(ui.bold('Cleaning deprecated files')):
-        for link, target in _links_to(_list_files(target), ROOT):
+        for link, target in links:
+            if link in remaining:
+                continue
+            remaining[link] = True
             rel = target.relative_to(ROOT)
-            if not target.is_file():
+
+            # Directories, such as submodules, are linked as a whole
+            if not target.exists():
                 ui.log(
                     ui.item((ui.removing('{} has been removed'.format(rel))))
                 )
@@ -134,11 +244,18 @@ def clean(
             if response == 0:
                 try:
                     link.unlink()
+                    remaining[link] = False
                 except OSError:
                     ui.log('Failed to remove file!')
             elif response is None:
                 ui.log('Not removing as we are not running in a terminal.')
 
+    # Forget links that no longer point into this directory, and remember
+    # those discovered by a full scan
+    state.store(
+        LINKS_STATE, sorted(str(p) for p, exists in remaining.items() if exists)
+    )
+
 
 def dependencies(
     invert: bool,
@@ -175,45 +292,91 @@ def dependencies(
 
 def update(
     apply: bool,
+    check_only: bool,
+    write_cache: bool,
+    cached: bool,
+    count: bool,
 ):
+    # Checks run unattended or from the shell prompt must not touch the tree
+    if not check_only and not cached:
+        git.sync_submodules()
+
     enabled_twigs = [t for t in TWIGS if t.enabled]
-    updates_for_twigs = {}
-    with ui.section(ui.bold('Updates for twigs'), delay=True):
+    entries = state.load(UPDATES_STATE, {}).get('twigs', {})
+    now = time.time()
+
+    # Reuse recently found updates unless asked to check everything
+    known = {
+        twig: entries[twig.name]['updates']
+        for twig in enabled_twigs
+        if twig.name in entries
+        and (
+            cached
+            or (
+                not check_only
+                and now - entries[twig.name]['time'] < UPDATES_MAX_AGE
+            )
+        )
+    }
+    stale = [t for t in enabled_twigs if t not in known and not cached]
+
+    def results():
+        yield from known.items()
         with concurrent.futures.ThreadPoolExecutor() as e:
             tasks = {
-                e.submit(lambda t: t.updates, twig): twig
-                for twig in enabled_twigs
+                e.submit(lambda t: t.updates, twig): twig for twig in stale
             }
             for task in concurrent.futures.as_completed(tasks):
                 twig = tasks[task]
                 updates = task.result()
-                if updates:
-                    updates_for_twigs[twig.name] = updates
-                with ui.section(
-                    '{name} - {description}'.format(
-                        name=ui.bold(twig.name), description=twig.description
-                    ),
-                    delay=True,
-                ):
-                    for update in updates:
-                        ui.log(ui.item(update))
+                entries[twig.name] = {'time': time.time(), 'updates': updates}
+                yield twig, updates
+
+    updates_for_twigs = {}
+    with ui.section(ui.bold('Updates for twigs'), delay=True):
+        for twig, updates in results():
+            if updates:
+                updates_for_twigs[twig.name] = updates
+            if count:
+                continue
+            with ui.section(
+                '{name} - {description}'.format(
+                    name=ui.bold(twig.name), description=twig.description
+                ),
+                delay=True,
+            ):
+                for update in updates:
+                    ui.log(ui.item(update))
+
+    if stale and (write_cache or not check_only):
+        _store_updates(enabled_twigs, entries)
+
+    if count:
+        print(sum(len(updates) for updates in updates_for_twigs.values()))
 
     if apply:
         with ui.section(ui.bold('Updating twigs'), delay=True):
             print()
-            for twig in (t for t in enabled_twigs if len(t.updates) > 0):
+            for twig in (
+                t
+                for t in enabled_twigs
+                if t.name in updates_for_twigs and len(t.updates) > 0
+            ):
                 with ui.section(
                     ui.item('Updating {}...'.format(ui.bold(twig.name)))
                 ):
                     instructions = twig.update()
                     if instructions is not None:
                         ui.log(instructions)
+                entries.pop(twig.name, None)
                 subprocess.check_call(
                     ['git', 'add', twig.source],
                     stdout=subprocess.DEVNULL,
                     stderr=subprocess.DEVNULL,
                     cwd=Path(__file__).parent.parent.parent,
                 )
+            git.repository.cache_clear()
+            _store_updates(enabled_twigs, entries)
         try:
             subprocess.check_call(
                 [
@@ -241,16 +404,217 @@ def update(
             pass
 
 
-def _list_files(target: Path) -> Generator[Path, None, None]:
-    """Lists all files in a directory.
+def _store_updates(enabled_twigs: List[Twig], entries: Dict[str, Any]):
+    """Stores found updates.
 
-    :param target: The target directory for files.
+    :param enabled_twigs: The enabled twigs.
+
+    :param entries: The found updates for all twigs, along with the time of
+    checking.
+    """
+    entries = {
+        t.name: entries[t.name] for t in enabled_twigs if t.name in entries
+    }
+    state.store(
+        UPDATES_STATE,
+        {
+            'time': time.time(),
+            'twigs': entries,
+        },
+    )
+
+
+def _preflight(enabled_twigs: List[Twig]) -> List[Twig]:
+    """Determines concurrently which enabled twigs are present.
+
+    Checkers may rely on the dependencies of their twig, so the checker of a
+    twig runs only once all its enabled dependencies are known to be present.
+    Twigs with missing dependencies, and twigs whose checker fails, are
+    checked again when they are about to be installed.
+
+    :param enabled_twigs: The enabled twigs, in dependency order.
+
+    :return: the twigs not known to be present, in dependency order
+    """
 
-    :return: a generator of paths
+    def check(twig: Twig) -> Optional[bool]:
+        try:
+            return twig.present
+        except Exception as e:
+            ui.log(
+                ui.removing(
+                    'Failed to check whether {} is present: {}'.format(
+                        twig.name, e
+                    )
+                )
+            )
+            return None
+
+    present = {}
+    with concurrent.futures.ThreadPoolExecutor() as e:
+        pending = list(enabled_twigs)
+        tasks = {}
+        while pending:
+            for twig in list(pending):
+                dependencies = [d for d in twig.dependencies if d.enabled]
+                if any(d.name not in present for d in dependencies):
+                    continue
+                pending.remove(twig)
+                if all(present[d.name] for d in dependencies):
+                    tasks[e.submit(check, twig)] = twig
+                else:
+                    present[twig.name] = None
+            if not tasks:
+                break
+            finished, _ = concurrent.futures.wait(
+                tasks, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for task in finished:
+                present[tasks.pop(task).name] = task.result()
+        for task in concurrent.futures.as_completed(tasks):
+            present[tasks[task].name] = task.result()
+
+    return [t for t in enabled_twigs if not present.get(t.name)]
+
+
+def _complete(enabled_twigs: List[Twig]):
+    """Runs the completers of all enabled twigs.
+
+    The completer of a twig runs after those of all twigs depending on it.
+    Silent completers without such a relationship run concurrently, while
+    interactive completers run on their own, since they share the terminal.
+    Completers whose inputs are unchanged since they last succeeded are
+    skipped.
+
+    :param enabled_twigs: The enabled twigs, in dependency order.
     """
-    for root, dirs, files in os.walk(target):
-        root = Path(root)
-        yield from (path for path in (root / f for f in files))
+    completed = state.load(COMPLETERS_STATE, {})
+
+    def complete(twig: Twig):
+        inputs = twig.inputs()
+        if inputs is None or completed.get(twig.name) != inputs:
+            twig.complete()
+        return inputs
+
+    dependents = {
+        twig.name: {
+            t.name
+            for t in enabled_twigs
+            if any(d.name == twig.name for d in t.dependencies)
+        }
+        for twig in enabled_twigs
+    }
+    done = set()
+    try:
+        with concurrent.futures.ThreadPoolExecutor() as e:
+            pending = list(reversed(enabled_twigs))
+            tasks = {}
+            while pending or tasks:
+                ready = [t for t in pending if dependents[t.name] <= done]
+                for twig in ready:
+                    if not twig.interactive_completer:
+                        pending.remove(twig)
+                        tasks[e.submit(complete, twig)] = twig
+                if not tasks:
+                    twig = next(
+                        (t for t in ready if t.interactive_completer), None
+                    )
+                    if twig is None:
+                        raise NestException(
+                            'Circular dependencies between twigs: {}',
+                            ', '.join(t.name for t in pending),
+                        )
+                    pending.remove(twig)
+                    inputs = complete(twig)
+                    if inputs is not None:
+                        completed[twig.name] = inputs
+                    done.add(twig.name)
+                    continue
+                finished, _ = concurrent.futures.wait(
+                    tasks, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for task in finished:
+                    twig = tasks.pop(task)
+                    inputs = task.result()
+                    if inputs is not None:
+                        completed[twig.name] = inputs
+                    done.add(twig.name)
+    finally:
+        state.store(COMPLETERS_STATE, completed)
+
+
+def _scan_links(
+    target: Path,
+    prune: Sequence[str],
+) -> Generator[tuple[Path, Path], None, None]:
+    """Lists all symlinks in a directory tree.
+
+    The subdirectories of ``target`` are scanned concurrently. Directories
+    matching any of the patterns in ``prune`` and directories on other file
+    systems are skipped, and only symlinks are read. Symlinks to directories
+    are listed, but not followed.
+
+    :param target: The directory to scan.
+
+    :param prune: Patterns for directories to skip; see :data:`PRUNE`.
+
+    :return: a generator of tuples of symlink and link target
+    """
+    try:
+        device = os.lstat(target).st_dev
+    except OSError:
+        ui.log('Failed to read {}!'.format(ui.removing(target)))
+        return
+
+    def is_pruned(rel: str, name: str) -> bool:
+        return any(
+            fnmatch.fnmatchcase(rel if '/' in pattern else name, pattern)
+            for pattern in prune
+        )
+
+    def scan_directory(
+        path: str,
+        rel: str,
+        links: List[tuple[Path, Path]],
+        directories: List[tuple[str, str]],
+    ):
+        try:
+            entries = os.scandir(path)
+        except OSError:
+            ui.log('Failed to read {}!'.format(ui.removing(path)))
+            return
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_symlink():
+                        links.append(
+                            (Path(entry.path), Path(os.readlink(entry)))
+                        )
+                    elif (
+                        entry.is_dir(follow_symlinks=False)
+                        and not is_pruned(rel + entry.name, entry.name)
+                        and entry.stat(follow_symlinks=False).st_dev == device
+                    ):
+                        directories.append((entry.path, rel + entry.name + '/'))
+                except OSError:
+                    ui.log('Failed to read {}!'.format(ui.removing(entry.path)))
+
+    def scan(path: str, rel: str) -> List[tuple[Path, Path]]:
+        links = []
+        directories = [(path, rel)]
+        while directories:
+            scan_directory(*directories.pop(), links, directories)
+        return links
+
+    # Scan the top level here, and every subdirectory in a separate task
+    links = []
+    directories = []
+    scan_directory(target, '', links, directories)
+    yield from links
+    with concurrent.futures.ThreadPoolExecutor() as e:
+        tasks = [e.submit(scan, path, rel) for (path, rel) in directories]
+        for task in concurrent.futures.as_completed(tasks):
+            yield from task.result()
 
 
 def _links_to(
@@ -331,6 +695,12 @@ if __name__ == '__main__':
     build_parser.add_argument(
         '--target', help='the target directory', type=Path, default=HOME
     )
+    build_parser.add_argument(
+        '--purge-all',
+        help='remove all disabled twigs, not only those installed by a '
+        'previous build',
+        action='store_true',
+    )
 
     clean_parser = actions.add_parser(
         'clean',
@@ -345,6 +715,21 @@ if __name__ == '__main__':
         help='whether to force removal of files without querying',
         action='store_true',
     )
+    clean_parser.add_argument(
+        '--full-scan',
+        help='scan the entire target directory instead of only the links '
+        'created by build',
+        action='store_true',
+    )
+    clean_parser.add_argument(
+        '--prune',
+        help='a pattern for directories to skip during a full scan; may be '
+        'given several times, and replaces the default patterns {}'.format(
+            ', '.join(PRUNE)
+        ),
+        action='append',
+        metavar='PATTERN',
+    )
 
     dependencies_parser = actions.add_parser(
         'dependencies', help='list all twigs and their dependencies'
@@ -364,9 +749,30 @@ if __name__ == '__main__':
     update_parser = actions.add_parser(
         'update', help='manage updates for twigs'
     )
-    update_parser.add_argument(
+    update_mode = update_parser.add_mutually_exclusive_group()
+    update_mode.add_argument(
         '--apply', action='store_true', dest='apply', help='apply the updates'
     )
+    update_mode.add_argument(
+        '--check-only',
+        action='store_true',
+        help='check all twigs for updates, ignoring recently found updates',
+    )
+    update_mode.add_argument(
+        '--cached',
+        action='store_true',
+        help='only list updates found by a previous check',
+    )
+    update_parser.add_argument(
+        '--write-cache',
+        action='store_true',
+        help='store the found updates when running with --check-only',
+    )
+    update_parser.add_argument(
+        '--count',
+        action='store_true',
+        help='only print the number of updates',
+    )
 
     handlers = {
         'build': build,
@@ -385,8 +791,11 @@ if __name__ == '__main__':
 
     try:
         arguments = vars(parser.parse_args())
-        initialize(arguments.pop('no_environment_header'))
-        handlers[arguments.pop('command')](**arguments)
+        if arguments.get('write_cache') and not arguments['check_only']:
+            update_parser.error('--write-cache requires --check-only')
+        with event_loop():
+            initialize(arguments.pop('no_environment_header'))
+            handlers[arguments.pop('command')](**arguments)
     except NestException as e:
         sys.stderr.write(
             'An unexpected error occurred: {}\n'.format(
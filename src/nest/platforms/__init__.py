@@ -1,4 +1,3 @@
-import functools
 import importlib
 import os
 import re
@@ -27,6 +26,12 @@ class Distribution:
     def __str__(self):
         return self._name
 
+    def __repr__(self):
+        return '{}({})'.format(
+            self.__class__.__name__,
+            ', '.join(repr(p) for p in (self._name, *self._parts)),
+        )
+
     def __eq__(self, o):
         parts = set(o._parts) if isinstance(o, self.__class__) else {o}
         return bool(set(self._parts).intersection(parts))
@@ -36,35 +41,219 @@ class Distribution:
         return '/'.join(self._parts)
 
 
-@functools.total_ordering
 class Version:
     """A representation of a version.
 
-    A version is a sequence of numbers.
+    A version is parsed from a string following either semantic versioning,
+    such as ``1.0.0-beta.1+build``, or :pep:`440`, such as ``1!2.0rc1.post1``,
+    or from a tuple of numbers. Build metadata and local version labels are
+    ignored when comparing, and trailing zeros are insignificant, so
+    ``Version('1.0') == Version('1')``.
+
+    A single number following a hyphen, as in ``1.0-1``, is a post-release as
+    in :pep:`440` and Debian revisions, and not a semantic versioning
+    pre-release; any other hyphenated suffix, such as ``1.0.0-1.2`` or
+    ``1.0.0-rc.1``, is a pre-release.
+
+    Recently parsed versions are cached, so parsing the same string again
+    usually yields the same instance, and versions are hashable. Comparisons
+    use a tuple key computed once when parsing.
     """
 
-    def __init__(self, s):
-        if isinstance(s, tuple):
-            self._version = s
-        elif isinstance(s, str):
-            self._version = tuple(int(p) for p in s.split('.'))
+    __slots__ = ('_key', '_string')
+
+    def __new__(cls, s):
+        if isinstance(s, Version):
+            return s
+        try:
+            self = _VERSIONS.get(s)
+        except TypeError:
+            raise ValueError(s)
+        if self is not None:
+            return self
+
+        self = object.__new__(cls)
+        if isinstance(s, str):
+            self._string = s.strip()
+            self._key = _parse(self._string)
+        elif isinstance(s, tuple):
+            if not all(isinstance(p, int) for p in s):
+                raise ValueError(s)
+            self._string = '.'.join(str(p) for p in s)
+            self._key = (0, _release(s), _FINAL, -1, _NOT_DEV)
         else:
             raise ValueError(s)
+        if len(_VERSIONS) >= _VERSIONS_SIZE:
+            _VERSIONS.clear()
+        _VERSIONS[s] = self
+        return self
+
+    @property
+    def is_prerelease(self) -> bool:
+        """Whether this is a pre-release or a development release."""
+        return self._key[2] != _FINAL or self._key[4] != _NOT_DEV
+
+    def __reduce__(self):
+        return (self.__class__, (self._string,))
 
     def __str__(self):
-        return '.'.join(str(v) for v in self._version)
+        return self._string
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, str(self))
+
+    def __hash__(self):
+        return hash(self._key)
 
     def __eq__(self, o):
-        o = o if isinstance(o, self.__class__) else self.__class__(o)
-        return (
-            True
-            and len(self._version) == len(o._version)
-            and all(a == b for (a, b) in zip(self._version, o._version))
-        )
+        if not isinstance(o, Version):
+            try:
+                o = Version(o)
+            except ValueError:
+                return NotImplemented
+        return self._key == o._key
 
     def __lt__(self, o):
-        o = o if isinstance(o, self.__class__) else self.__class__(o)
-        return self._version < o._version
+        if not isinstance(o, Version):
+            o = Version(o)
+        return self._key < o._key
+
+    def __le__(self, o):
+        if not isinstance(o, Version):
+            o = Version(o)
+        return self._key <= o._key
+
+    def __gt__(self, o):
+        if not isinstance(o, Version):
+            o = Version(o)
+        return self._key > o._key
+
+    def __ge__(self, o):
+        if not isinstance(o, Version):
+            o = Version(o)
+        return self._key >= o._key
+
+
+#: Recently parsed versions.
+_VERSIONS = {}
+
+#: The number of parsed versions kept in :data:`_VERSIONS`.
+_VERSIONS_SIZE = 4096
+
+#: The regular expression matching a version string. The groups are the
+#: epoch, the release, the pre-release part, the implicit and explicit
+#: post-release numbers and the development release number. Build metadata and
+#: local version labels are matched but not captured.
+_VERSION_RE = re.compile(
+    r"""
+    v?
+    (?:(\d+)!)?
+    (\d+(?:\.\d+)*)
+    (?:[-_.]?((?:[a-z]+|\d+)(?:[-_.]?(?:[a-z]+|\d+))*?))??
+    (?:-(\d+)|[-_.]?(?:post|rev|r)[-_.]?(\d*))?
+    (?:[-_.]?dev[-_.]?(\d*))?
+    (?:\+[a-z0-9._-]*)?
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+#: The regular expression matching pre-release identifiers.
+_IDENTIFIER_RE = re.compile(r'\d+|[a-z]+')
+
+#: The ranks of well known pre-release identifiers. Numeric identifiers sort
+#: before these, and all other identifiers after these.
+_PHASES = {
+    'dev': 0,
+    'a': 1,
+    'alpha': 1,
+    'b': 2,
+    'beta': 2,
+    'c': 3,
+    'pre': 3,
+    'preview': 3,
+    'rc': 3,
+}
+
+#: The pre-release part of the key of a final release, sorting after all
+#: pre-releases.
+_FINAL = ((3, 0, ''),)
+
+#: The pre-release part of the key of a development release of a final
+#: release, sorting before all pre-releases.
+_DEV = ()
+
+#: The development release part of the key of a version that is not a
+#: development release, sorting after all development releases.
+_NOT_DEV = (1,)
+
+
+def _release(parts: Tuple[int, ...]) -> Tuple[int, ...]:
+    """Removes trailing zeros from a release.
+
+    :param parts: The release numbers.
+
+    :return: the significant release numbers
+    """
+    end = len(parts)
+    while end > 0 and parts[end - 1] == 0:
+        end -= 1
+    return parts[:end]
+
+
+def _parse(s: str) -> Tuple:
+    """Parses a version string into a comparison key.
+
+    The key is the tuple ``(epoch, release, pre_release, post_release,
+    dev_release)``, where every pre-release identifier is a tuple ``(rank,
+    number, text)``, so that identifiers of different kinds are never compared
+    directly. As in :pep:`440`, a development release sorts before the version
+    it precedes, and a development release of a final release before all its
+    pre-releases.
+
+    :param s: The version string.
+
+    :return: the key
+
+    :raise ValueError: if ``s`` is not a version
+    """
+    # Most versions are plain release numbers; empty parts and digits that are
+    # not decimal are rejected by int
+    if s.replace('.', '').isdigit():
+        try:
+            release = tuple(map(int, s.split('.')))
+        except ValueError:
+            pass
+        else:
+            if not release[-1]:
+                release = _release(release)
+            return (0, release, _FINAL, -1, _NOT_DEV)
+
+    m = _VERSION_RE.fullmatch(s)
+    if m is None:
+        raise ValueError(s)
+    epoch, release, pre, implicit_post, post, dev = m.groups()
+    if implicit_post is not None:
+        post = implicit_post
+    if pre:
+        identifiers = tuple(
+            (0, int(i), '')
+            if i.isdigit()
+            else (1, _PHASES[i], '')
+            if i in _PHASES
+            else (2, 0, i)
+            for i in _IDENTIFIER_RE.findall(pre.lower())
+        )
+    elif dev is not None and post is None:
+        identifiers = _DEV
+    else:
+        identifiers = _FINAL
+    return (
+        int(epoch or 0),
+        _release(tuple(int(p) for p in release.split('.'))),
+        identifiers,
+        -1 if post is None else int(post or 0),
+        _NOT_DEV if dev is None else (0, int(dev or 0)),
+    )
 
 
 def current() -> Tuple[Distribution, Version]:
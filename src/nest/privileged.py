@@ -0,0 +1,175 @@
+"""A helper performing file system operations with raised privileges.
+
+When run as a script, this module reads requests from ``STDIN`` and writes a
+result for every request to ``STDOUT``. Every request and result is a JSON
+object on a single line. A request contains the name of the operation as
+``op`` and its arguments; a result contains ``error`` if the operation failed.
+
+This module must not import anything from *nest*, since it is run by a
+different user and possibly a different Python interpreter.
+"""
+
+import base64
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+
+from typing import Any, Dict, List, Optional
+
+
+class Helper:
+    """A client for a helper process.
+
+    The process is started when the first request is made, and is then used
+    for all subsequent requests, so privileges are raised at most once.
+    """
+
+    def __init__(self, command: List[str]):
+        """Initialises a client.
+
+        :param command: The command starting the helper, typically by means
+        of ``sudo``.
+        """
+        self._command = command
+        self._process = None
+        self._lock = threading.Lock()
+
+    def mkdir(self, path: str):
+        """Creates a directory and its parents.
+
+        :param path: The directory.
+        """
+        self._request('mkdir', path=str(path))
+
+    def symlink(self, path: str, source: str):
+        """Creates a symlink.
+
+        :param path: The symlink to create.
+
+        :param source: The file to link to.
+        """
+        self._request('symlink', path=str(path), source=str(source))
+
+    def unlink(self, path: str):
+        """Removes a file.
+
+        :param path: The file to remove.
+        """
+        self._request('unlink', path=str(path))
+
+    def write(self, path: str, data: bytes, mode: Optional[int] = None):
+        """Writes data to a file, atomically replacing any previous content.
+
+        :param path: The file to write.
+
+        :param data: The data to write.
+
+        :param mode: An optional file mode to apply. If not specified, the mode
+        of an existing file is kept.
+        """
+        self._request(
+            'write',
+            path=str(path),
+            data=base64.b64encode(data).decode('ascii'),
+            mode=mode,
+        )
+
+    def chmod(self, path: str, mode: int):
+        """Changes the mode of a file.
+
+        :param path: The file.
+
+        :param mode: The new file mode.
+        """
+        self._request('chmod', path=str(path), mode=mode)
+
+    def close(self):
+        """Stops the helper process, if it is running."""
+        with self._lock:
+            if self._process is not None:
+                self._process.stdin.close()
+                self._process.wait()
+                self._process = None
+
+    def _request(self, op: str, **kwargs):
+        """Performs a single request.
+
+        :param op: The operation name.
+
+        :raise OSError: if the helper cannot be started, or the operation fails
+        """
+        with self._lock:
+            if self._process is None:
+                self._process = subprocess.Popen(
+                    self._command,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                )
+            try:
+                self._process.stdin.write(
+                    json.dumps(dict(op=op, **kwargs)).encode('utf-8') + b'\n'
+                )
+                self._process.stdin.flush()
+                line = self._process.stdout.readline()
+                result = json.loads(line)
+            except (OSError, ValueError):
+                self._process.kill()
+                self._process.wait()
+                self._process = None
+                raise OSError('the privileged helper exited unexpectedly')
+
+        if 'error' in result:
+            raise OSError(result['error'])
+
+
+def perform(request: Dict[str, Any]):
+    """Performs a single request.
+
+    :param request: The request.
+
+    :raise OSError: if the operation fails
+    :raise KeyError: if the request is invalid
+    """
+    op = request['op']
+    if op == 'mkdir':
+        os.makedirs(request['path'], exist_ok=True)
+    elif op == 'symlink':
+        os.symlink(request['source'], request['path'])
+    elif op == 'unlink':
+        os.unlink(request['path'])
+    elif op == 'write':
+        path, mode = request['path'], request.get('mode')
+        if mode is None and os.path.exists(path):
+            mode = os.stat(path).st_mode & 0o7777
+        directory, name = os.path.split(path)
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix='.' + name)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(base64.b64decode(request['data']))
+            os.chmod(temporary, 0o644 if mode is None else mode)
+            os.replace(temporary, path)
+        except:
+            os.unlink(temporary)
+            raise
+    elif op == 'chmod':
+        os.chmod(request['path'], request['mode'])
+    else:
+        raise KeyError(op)
+
+
+def main():
+    for line in sys.stdin.buffer:
+        try:
+            perform(json.loads(line))
+            result = {}
+        except Exception as e:
+            result = {'error': str(e)}
+        sys.stdout.write(json.dumps(result) + '\n')
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import json
+import os
+import tempfile
+
+from typing import Any
+
+from . import directories
+
+#: The directory containing state persisted between runs.
+PATH = directories.CACHE / 'nest'
+
+
+def load(name: str, default: Any = None) -> Any:
+    """Loads a persisted value.
+
+    :param name: The name of the value.
+
+    :param default: The value to return if nothing has been persisted, or the
+    persisted value cannot be read.
+
+    :return: the persisted value
+    """
+    try:
+        with open(PATH / '{}.json'.format(name), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def store(name: str, value: Any):
+    """Persists a value.
+
+    The value is written to a temporary file which then replaces any previous
+    value, so a value is never partially written.
+
+    :param name: The name of the value.
+
+    :param value: The value to persist. This must be serialisable as JSON.
+    """
+    os.makedirs(PATH, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=PATH, prefix='.{}.'.format(name))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(value, f)
+        os.replace(path, PATH / '{}.json'.format(name))
+    except:
+        os.unlink(path)
+        raise
@@ -1,23 +1,43 @@
 import argparse
+import asyncio
+import atexit
+import collections
 import inspect
 import io
+import itertools
 import json
 import os
 import re
 import shlex
 import shutil
+import stat
 import subprocess
 import sys
 import tempfile
+import threading
+import time
 import urllib.request
+import uuid
+import weakref
 
 from contextlib import contextmanager
-from functools import lru_cache
+from functools import lru_cache, wraps
 from pathlib import Path
 from types import MethodType, ModuleType
-from typing import Any, Callable, Dict, IO, List, Optional, Set, Union
-
-from nest import ROOT, NestException, directories, ui
+from typing import (
+    Any,
+    Callable,
+    Coroutine,
+    Dict,
+    IO,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Union,
+)
+
+from nest import ROOT, NestException, directories, privileged, ui
 
 from . import ext as ext
 from .configuration import Configuration
@@ -55,9 +75,27 @@ PrepareCallback = Callable[['Self'], None]
 #: A function to actually install a twig.
 InstallCallback = Callable[['Self'], None]
 
+#: A function to install several twigs sharing the same batch installer at
+#: once.
+#:
+#: The return value, if present, is the subset of twigs actually installed.
+BatchInstallCallback = Callable[[List['Self']], Optional[List['Self']]]
+
+#: A function to determine the batch of this twig.
+#:
+#: Twigs sharing a batch installer are only installed together if this returns
+#: equal values for them; ``None`` means that this twig is installed on its
+#: own.
+BatchGroupCallback = Callable[['Self'], Optional[Any]]
+
 #: A function to complete installation of this twig.
 CompleteCallback = Callable[['Self'], None]
 
+#: A function to list the inputs of the completer of this twig.
+#:
+#: The return value must be serialisable as JSON.
+CompleterInputsCallback = Callable[['Self'], Any]
+
 #: A function to remove this twig.
 RemoveCallback = Callable[['Self'], None]
 
@@ -70,6 +108,9 @@ UpdateApplierCallback = Callable[['Self'], Optional[str]]
 #: The registered twigs.
 TWIGS = []
 
+#: Directories known to exist.
+_DIRECTORIES: Set[Path] = set()
+
 
 # Let ``from nest.twigs import *`` import all twigs
 __path__ = [str(TWIG_PATH)]
@@ -94,9 +135,13 @@ class Twig:
         ]
 
         self._installer = MethodType(installer, self)
+        self._batch_installer = None
+        self._batch_group = MethodType(lambda me: me._batch_installer, self)
         self._arguments = MethodType(lambda *_: {}, self)
         self._checker = MethodType(lambda *_: True, self)
         self._completer = MethodType(lambda *_: None, self)
+        self._completer_inputs = None
+        self._completer_interactive = False
         self._remover = MethodType(lambda *_: None, self)
         self._update_lister = MethodType(lambda *_: [], self)
         self._update_applier = MethodType(lambda *_: None, self)
@@ -193,10 +238,48 @@ class Twig:
         self._installer = MethodType(wrapper, self)
         return f
 
+    def batch_installer(self, f: BatchInstallCallback) -> BatchInstallCallback:
+        """A decorator to mark a callable as the batch installer for this twig.
+
+        When several missing twigs share the same batch installer, it is called
+        once with all of them instead of calling their install callbacks one by
+        one.
+
+        The callable must install the first twig passed, and may return the
+        subset of twigs it actually installed; the remaining twigs are then
+        installed later as usual.
+        """
+        self._batch_installer = f
+        return f
+
+    def batch_group(self, f: BatchGroupCallback) -> BatchGroupCallback:
+        """A decorator to mark a callable as determining the batch of this
+        twig.
+
+        By default, all twigs sharing a batch installer are installed together.
+        """
+        self._batch_group = MethodType(f, self)
+        return f
+
     def completer(self, f: CompleteCallback) -> CompleteCallback:
         """A decorator to mark a callable as the completer callback for this
         twig.
 
+        Any previously registered callback will be called before this one.
+
+        The callback may use the terminal, so it never runs at the same time as
+        other completers.
+        """
+        self._completer_interactive = True
+        return self.silent_completer(f)
+
+    def silent_completer(self, f: CompleteCallback) -> CompleteCallback:
+        """A decorator to mark a callable as a completer callback for this
+        twig that neither reads from nor writes to the terminal.
+
+        Completers of different twigs registered only with this decorator may
+        run concurrently.
+
         Any previously registered callback will be called before this one.
         """
         previous = self._completer
@@ -208,6 +291,19 @@ class Twig:
         self._completer = MethodType(wrapper, self)
         return f
 
+    def completer_inputs(
+        self, f: CompleterInputsCallback
+    ) -> CompleterInputsCallback:
+        """A decorator to mark a callable as listing the inputs of the
+        completer of this twig.
+
+        If a twig lists its inputs, the completer is only run when they have
+        changed since it last succeeded. See :func:`file_stamps` and
+        :func:`period` for common inputs.
+        """
+        self._completer_inputs = MethodType(f, self)
+        return f
+
     def remover(self, f: RemoveCallback) -> RemoveCallback:
         """A decorator to mark a callable as the remover callback for this
         twig.
@@ -420,6 +516,11 @@ class Twig:
             for dependency in self.dependencies
         )
 
+    @property
+    def interactive_completer(self) -> bool:
+        """Whether the completer of this twig may use the terminal."""
+        return self._completer_interactive
+
     @property
     def present(self) -> bool:
         """Whether the twig is currently present.
@@ -458,6 +559,42 @@ class Twig:
         self._installer()
         self._present = None
 
+    def install_batch(self, candidates: List['Self']) -> List['Self']:
+        """Installs this twig along with all missing twigs in ``candidates``
+        sharing its batch installer.
+
+        If this twig has no batch installer or batch, or no other twig in its
+        batch is missing, this is equivalent to :meth:`install`.
+
+        This method does not check whether this twig is already installed.
+
+        :param candidates: The twigs that may be installed along with this
+        twig. These must have all their dependencies installed.
+
+        :return: the twigs that were installed, including this twig
+        """
+        group = (
+            self._batch_group() if self._batch_installer is not None else None
+        )
+        batch = [self] + [
+            t
+            for t in candidates
+            if t is not self
+            and group is not None
+            and t._batch_installer is self._batch_installer
+            and t._batch_group() == group
+            and not t.present
+        ]
+        if len(batch) == 1:
+            self.install()
+        else:
+            installed = self._batch_installer(batch)
+            if installed is not None:
+                batch = [self] + [t for t in installed if t is not self]
+            for twig in batch:
+                twig._present = None
+        return batch
+
     def complete(self):
         """Runs the complete callback.
 
@@ -465,6 +602,18 @@ class Twig:
         """
         self._completer()
 
+    def inputs(self) -> Optional[Any]:
+        """Lists the inputs of the completer.
+
+        :return: the inputs, normalised through JSON so that they can be
+        compared with stored inputs, or ``None`` if this twig does not list
+        its inputs
+        """
+        if self._completer_inputs is None:
+            return None
+        else:
+            return json.loads(json.dumps(self._completer_inputs()))
+
     def remove(self):
         """Runs the remove callback.
 
@@ -493,6 +642,7 @@ class Twig:
         interactive=True,
         silent=False,
         env_path=None,
+        returncodes=(0,),
         **kwargs,
     ) -> Union[
         bool,
@@ -504,8 +654,8 @@ class Twig:
         :param check: Whether to capture errors and return ``False`` instead of
         aborting the process.
 
-        :param stdin: A stream providing ``STDIN`` for the process. This is not
-        supported if ``interactive`` is true.
+        :param stdin: A stream or a byte string providing ``STDIN`` for the
+        process. This is not supported if ``interactive`` is true.
 
         :param capture: Whether to capture output. If this is true, this
         function will return the output data.
@@ -524,6 +674,9 @@ class Twig:
 
         :param bin_path: An addition to ``$PATH``.
 
+        :param returncodes: The exit codes indicating success. Some commands,
+        such as ``grep``, exit with a non-zero code to report a result.
+
         :param args: The command and arguments as a sequence of strings.
 
         :param kwargs: Any token values used as replacements for strings on the
@@ -540,8 +693,18 @@ class Twig:
         assert not (capture and silent)
         assert not (stream and not capture)
 
-        # Override stdin if not interactive to force immediate error
-        ins = subprocess.DEVNULL if not interactive else stdin
+        # Pass data through a pipe, and override stdin if not interactive to
+        # force immediate error
+        data = stdin if isinstance(stdin, bytes) else None
+        ins = (
+            subprocess.PIPE
+            if data is not None
+            else stdin
+            if stdin is not None
+            else subprocess.DEVNULL
+            if not interactive
+            else None
+        )
 
         # Allow reading stdout if capturing, hide if silent, otherwise just
         # display it
@@ -556,13 +719,14 @@ class Twig:
         # Perform string interpolation on kwargs for all command arguments
         args = [Twig.interpolate(arg, kwargs.get) for arg in args]
 
-        try:
-            env = os.environ
-            if env_path is not None:
-                env['PATH'] = (
-                    os.pathsep.join(env_path) + os.pathsep + env['PATH']
-                )
+        env = None
+        if env_path is not None:
+            env = dict(
+                os.environ,
+                PATH=os.pathsep.join([*env_path, os.environ['PATH']]),
+            )
 
+        try:
             p = subprocess.Popen(
                 args,
                 stdin=ins,
@@ -574,8 +738,8 @@ class Twig:
             if stream:
                 return p
             else:
-                stdout, _ = p.communicate()
-                if p.returncode == 0:
+                stdout, _ = p.communicate(data)
+                if p.returncode in returncodes:
                     return stdout.decode('utf-8') if capture else True
                 elif check:
                     return False
@@ -593,7 +757,94 @@ class Twig:
             p.returncode,
         )
 
-    def run_progress(self, *args, progress_re: re.Pattern = None, **kwargs):
+    async def arun(
+        self,
+        *args,
+        check=False,
+        stdin=None,
+        capture=False,
+        cwd=None,
+        silent=False,
+        env_path=None,
+        returncodes=(0,),
+        **kwargs,
+    ) -> Union[bool, str]:
+        """Runs a command asynchronously.
+
+        This is the asynchronous counterpart of :meth:`run`, and accepts the
+        same arguments and performs the same interpolation. Commands run this
+        way never read from the terminal, so ``stdin`` is either a byte string
+        or not connected.
+
+        The number of commands running at the same time in one event loop is
+        limited by :data:`MAX_CONCURRENT_PROCESSES`. Use :func:`wait` to run
+        coroutines from synchronous code.
+
+        :returns: whether the command succeeded if ``capture`` is ``False``,
+        otherwise the output data
+
+        :raise NestException: if the command returns a non-zero exit code and
+        ``check`` is not ``True``
+        """
+        assert not (check and capture)
+        assert not (capture and silent)
+        assert stdin is None or isinstance(stdin, bytes)
+
+        outs = (
+            subprocess.PIPE
+            if capture
+            else subprocess.DEVNULL
+            if silent
+            else None
+        )
+        args = [Twig.interpolate(arg, kwargs.get) for arg in args]
+        env = None
+        if env_path is not None:
+            env = dict(
+                os.environ,
+                PATH=os.pathsep.join([*env_path, os.environ['PATH']]),
+            )
+
+        async with _semaphore():
+            try:
+                p = await asyncio.create_subprocess_exec(
+                    *args,
+                    stdin=(
+                        subprocess.PIPE
+                        if stdin is not None
+                        else subprocess.DEVNULL
+                    ),
+                    stdout=outs,
+                    stderr=subprocess.STDOUT,
+                    cwd=cwd,
+                    env=env,
+                )
+            except FileNotFoundError:
+                if check:
+                    return False
+                else:
+                    raise
+            stdout, _ = await p.communicate(stdin)
+
+        if p.returncode in returncodes:
+            return stdout.decode('utf-8') if capture else True
+        elif check:
+            return False
+        else:
+            raise NestException(
+                'Command {} for {} failed with code {}',
+                ' '.join(args),
+                self.name,
+                p.returncode,
+            )
+
+    def run_progress(
+        self,
+        *args,
+        progress_re: re.Pattern = None,
+        check: bool = False,
+        **kwargs,
+    ) -> bool:
         """Runs a command in stream mode, outputting progress.
 
         The progress meter is updated when lines matching ``progress_re`` are
@@ -601,7 +852,16 @@ class Twig:
         capture groups ``current`` and ``max``, or the single ``percent`` used
         to determine the current progress.
 
+        The output is written to a log file for this twig, and only the last
+        :data:`TAIL_SIZE` bytes are kept in memory; these are printed if the
+        command fails.
+
         All other arguments are passed on to :meth:`run`.
+
+        :param check: Whether to return ``False`` if the command fails instead
+        of printing its output and exiting.
+
+        :return: whether the command succeeded
         """
 
         def progress_value(m):
@@ -625,22 +885,44 @@ class Twig:
             def progress_value(m):
                 return float(m.group('percent')) / 100
 
+        # Only decode and match lines containing the literal prefix of the
+        # regular expression
+        prefix = (
+            None
+            if progress_re is None
+            else b''
+            if progress_re.flags & re.IGNORECASE
+            else _literal_prefix(progress_re.pattern).encode('utf-8')
+        )
+
+        log_path = LOG_PATH / '{}.log'.format(self.name)
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        tail = collections.deque()
+        tail_size = 0
+
         child = self.run(
             *args, **kwargs, capture=True, stream=True, interactive=False
         )
-        output = b''
-        with ui.progress() as progress:
+        with ui.progress(self.name) as progress, open(log_path, 'wb') as log:
             for line in child.stdout:
-                output += line
-                try:
-                    m = next(progress_re.finditer(line.decode('utf-8')))
-                    progress(progress_value(m))
-                except StopIteration:
-                    pass
+                log.write(line)
+                tail.append(line)
+                tail_size += len(line)
+                while tail_size > TAIL_SIZE and len(tail) > 1:
+                    tail_size -= len(tail.popleft())
+
+                if prefix is not None and prefix in line:
+                    m = progress_re.search(line.decode('utf-8', 'replace'))
+                    if m is not None:
+                        progress(progress_value(m))
         code = child.wait()
         if code != 0:
-            os.write(sys.stdout.fileno(), output)
+            if check:
+                return False
+            os.write(sys.stdout.fileno(), b''.join(tail))
+            ui.log('The full output is available in {}'.format(log_path))
             sys.exit(code)
+        return True
 
     def list_files(self, directory: Path) -> List[Path]:
         """Recursively lists files in a directory.
@@ -677,15 +959,14 @@ class Twig:
 
         :param target: The target directory.
         """
+        if target in _DIRECTORIES:
+            return
+
+        cause = None
         try:
             os.makedirs(target, exist_ok=True)
         except PermissionError:
-            self.run(
-                *shlex.split(self.configuration.nest.root.mkdir()),
-                target=target,
-                interactive=True,
-                silent=False,
-            )
+            self._privileged('mkdir', target)
         except Exception as e:
             cause = e
 
@@ -696,6 +977,7 @@ class Twig:
                 self.name,
                 cause,
             )
+        _DIRECTORIES.add(target)
 
     def unlink(self, target: Path):
         """Removes a file.
@@ -711,12 +993,7 @@ class Twig:
             try:
                 os.unlink(target)
             except PermissionError:
-                self.run(
-                    *shlex.split(self.configuration.nest.root.unlink()),
-                    target=target,
-                    interactive=True,
-                    silent=False,
-                )
+                self._privileged('unlink', target)
             except Exception as e:
                 raise NestException(
                     'failed to remove file {} for twig {}: {}',
@@ -755,13 +1032,7 @@ class Twig:
             try:
                 target.symlink_to(source)
             except PermissionError:
-                self.run(
-                    *shlex.split(self.configuration.nest.root.ln()),
-                    source=source,
-                    target=target,
-                    interactive=True,
-                    silent=False,
-                )
+                self._privileged('symlink', target, source)
             except Exception as e:
                 raise NestException(
                     'failed to create symlink {} for twig {}: {}',
@@ -775,47 +1046,88 @@ class Twig:
         source: io.RawIOBase,
         target: Path,
         mode: Optional[int] = None,
-    ):
+    ) -> int:
         """Creates a file and writes data to it.
 
+        The target file is only written if its content differs from the
+        source data. The data is then written to a temporary file, which
+        replaces the target file once complete.
+
         If access is denied, an attempt to raise privileges is made.
 
         :param source: The source data to write. All data in this reader is
         written to the target file.
         :param target: The target file.
-        :param mode: An optional file mode to apply to the target file.
+        :param mode: An optional file mode to apply to the target file. If not
+        specified, the mode of an existing target file is kept.
+
+        :return: the number of bytes written, which is ``0`` if the target file
+        was already up to date
         """
         # Make sure the target directory exists, and the target file does not
+        # if it is a link
         self.directory(target.parent)
         if target.is_symlink():
             self.unlink(target)
 
+        # Remember where the data starts, since it must be read again if the
+        # privileged helper has to write it after a failed attempt
         try:
-            with open(target, 'wb') as f:
-                size = 4 * 1024 * 1024
-                while True:
-                    buffer = source.read(size)
-                    f.write(buffer)
-                    if len(buffer) < size:
-                        break
-            if mode is not None:
-                target.chmod(mode)
+            position = source.tell() if source.seekable() else None
+        except (AttributeError, OSError):
+            position = None
+
+        try:
+            chunks = _changed_content(source, target)
         except PermissionError:
-            self.run(
-                *shlex.split(self.configuration.nest.root.cat()),
-                target=target,
-                stdin=source,
-                interactive=True,
-                silent=False,
+            # The current file cannot be read, so no data has been compared
+            if position is not None:
+                source.seek(position)
+            chunks = iter(lambda: source.read(CHUNK_SIZE), b'')
+        except Exception as e:
+            raise NestException(
+                'failed to read file {} for twig {}: {}',
+                str(target),
+                self.name,
+                e,
             )
-            if mode is not None:
-                self.run(
-                    *shlex.split(self.configuration.nest.root.chmod()),
-                    mode='{:o}'.format(mode),
-                    target=target,
-                    interactive=True,
-                    silent=False,
+
+        if chunks is None:
+            if mode is not None and (
+                stat.S_IMODE(target.stat().st_mode) != stat.S_IMODE(mode)
+            ):
+                try:
+                    target.chmod(mode)
+                except PermissionError:
+                    self._privileged('chmod', target, mode)
+            return 0
+
+        # Data from a source that cannot be rewound is streamed, and can only
+        # be passed to the privileged helper if none of it has been consumed
+        consumed = False
+
+        def stream():
+            nonlocal consumed
+            consumed = True
+            yield from chunks
+
+        try:
+            return _replace(target, stream(), mode)
+        except PermissionError as e:
+            if position is not None:
+                source.seek(position)
+                data = source.read()
+            elif not consumed:
+                data = b''.join(chunks)
+            else:
+                raise NestException(
+                    'failed to create file {} for twig {}: {}',
+                    str(target),
+                    self.name,
+                    e,
                 )
+            self._privileged('write', target, data, mode)
+            return len(data)
         except Exception as e:
             raise NestException(
                 'failed to create file {} for twig {}: {}',
@@ -844,6 +1156,9 @@ class Twig:
         :param target: The target file.
         :param mode: The file mode for the new file. If not specified, the mode
         of the template file is used.
+
+        :return: the number of bytes written, which is ``0`` if the target file
+        was already up to date
         """
         try:
             data = source.read_text().format(**kwargs).encode('utf-8')
@@ -854,7 +1169,35 @@ class Twig:
                 self.name,
                 e,
             )
-        self.file(io.BytesIO(data), target, mode or source.stat().st_mode)
+        return self.file(
+            io.BytesIO(data), target, mode or source.stat().st_mode
+        )
+
+    def _privileged(self, op: str, target: Path, *args):
+        """Performs a file system operation with raised privileges.
+
+        All such operations are performed by a single helper process, which is
+        started the first time privileges are required.
+
+        :param op: The name of the operation; this is the name of a method of
+        :class:`nest.privileged.Helper`.
+        :param target: The file or directory to operate on.
+        :param args: Any additional arguments for the operation.
+
+        :raise NestException: if the operation fails
+        """
+        try:
+            getattr(
+                _privileged_helper(self.configuration.nest.root.helper()), op
+            )(target, *args)
+        except OSError as e:
+            raise NestException(
+                'failed to {} {} with raised privileges for twig {}: {}',
+                op,
+                str(target),
+                self.name,
+                e,
+            )
 
 
 class Web:
@@ -948,7 +1291,7 @@ class Web:
             else:
                 buffer = io.BytesIO()
                 total = int(c.headers['Content-Length'])
-                with ui.progress() as update:
+                with ui.progress(self._twig.name) as update:
                     while buffer.tell() < total:
                         buffer.write(c.read(1024))
                         update(buffer.tell() / total)
@@ -1251,6 +1594,7 @@ def archive(
         archive_file = archive(me.stored_version)
         target_dir = extract_to(me.stored_version)
         files = set()
+        written = 0
         for path, data in (
             (path, data)
             for (path, data) in list_files(me, archive_file)
@@ -1264,14 +1608,15 @@ def archive(
                     target_dir,
                 )
             else:
-                if not target.exists():
-                    me.file(data(), target)
+                written += me.file(data(), target)
                 files.add(target.relative_to(target_dir))
         if exclusive:
             for path in (
                 path for path in me.list_files(target_dir) if path not in files
             ):
                 (target_dir / path).unlink()
+        if written:
+            ui.log(ui.item('Extracted {} bytes'.format(written)))
 
     @main.checker
     def is_installed(me: Twig) -> bool:
@@ -1303,6 +1648,317 @@ def archive(
     return main
 
 
+def shared(f: Callable[..., Any]) -> Callable[..., Any]:
+    """A decorator caching the values of a function.
+
+    Unlike :func:`functools.lru_cache`, a value is computed only once even if
+    the function is called concurrently from several threads; any other caller
+    waits for the first one to finish. The arguments must be hashable.
+
+    The cache can be cleared by calling ``cache_clear`` on the returned
+    function.
+
+    :param f: The function to cache.
+
+    :return: a cached function
+    """
+    lock = threading.RLock()
+    cached = lru_cache(maxsize=None)(f)
+
+    @wraps(f)
+    def inner(*args):
+        with lock:
+            return cached(*args)
+
+    inner.cache_clear = cached.cache_clear
+    return inner
+
+
+#: The directory containing the output of commands run by
+#: :meth:`Twig.run_progress`.
+LOG_PATH = directories.CACHE / 'nest' / 'logs'
+
+#: The number of bytes of output kept in memory by :meth:`Twig.run_progress`.
+TAIL_SIZE = 64 * 1024
+
+#: Characters with a special meaning in regular expressions.
+REGEX_SPECIAL = frozenset('.^$*+?{}[]|()\\')
+
+#: The maximum number of commands run concurrently by :meth:`Twig.arun` in a
+#: single event loop.
+MAX_CONCURRENT_PROCESSES = 32
+
+#: The event loop started by :func:`event_loop`, if running.
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+#: The semaphores limiting concurrent commands, for every event loop.
+_SEMAPHORES: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+@contextmanager
+def event_loop():
+    """Runs an event loop in a background thread for the duration of the
+    context.
+
+    While the context is active, :func:`wait` runs coroutines on this loop, so
+    coroutines from all threads share a single loop and a single limit on
+    concurrent commands.
+    """
+    global _LOOP
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(
+        target=loop.run_forever, name='nest-event-loop', daemon=True
+    )
+    thread.start()
+    _LOOP = loop
+    try:
+        yield loop
+    finally:
+        _LOOP = None
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+def wait(coroutine: Coroutine[Any, Any, Any]) -> Any:
+    """Runs a coroutine from synchronous code and waits for its result.
+
+    If an event loop has been started with :func:`event_loop`, the coroutine
+    runs there, otherwise a new event loop is used. This function must not be
+    called from a coroutine.
+
+    :param coroutine: The coroutine to run.
+
+    :return: the result of the coroutine
+    """
+    loop = _LOOP
+    if loop is None:
+        return asyncio.run(coroutine)
+    else:
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+
+def _semaphore() -> asyncio.Semaphore:
+    """Returns the semaphore limiting concurrent commands in the running event
+    loop.
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in _SEMAPHORES:
+        _SEMAPHORES[loop] = asyncio.Semaphore(MAX_CONCURRENT_PROCESSES)
+    return _SEMAPHORES[loop]
+
+
+#: The size of the chunks in which files are copied and compared.
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def _changed_content(
+    source: io.RawIOBase,
+    target: Path,
+) -> Optional[Iterator[bytes]]:
+    """Compares data with the content of a file.
+
+    The data and file are compared chunk by chunk, so neither is read entirely
+    into memory. If the size of the data can be determined, the file is only
+    read if the sizes match.
+
+    :param source: The data.
+    :param target: The file.
+
+    :return: ``None`` if the content of the file equals the data, otherwise an
+    iterator over all chunks of the data
+    """
+    rest = iter(lambda: source.read(CHUNK_SIZE), b'')
+    try:
+        current = open(target, 'rb')
+    except FileNotFoundError:
+        return rest
+
+    with current:
+        try:
+            position = source.tell()
+            size = source.seek(0, os.SEEK_END) - position
+            source.seek(position)
+            if size != os.fstat(current.fileno()).st_size:
+                return rest
+        except (AttributeError, OSError):
+            pass
+
+        # The prefix read so far is equal in both, so it can be read again
+        # from the current file if a difference is found
+        offset = 0
+        while True:
+            buffer = source.read(CHUNK_SIZE)
+            if buffer != current.read(len(buffer) or 1):
+                current.seek(0)
+                prefix = current.read(offset)
+                return itertools.chain([prefix, buffer], rest)
+            elif not buffer:
+                return None
+            offset += len(buffer)
+
+
+def _replace(
+    target: Path,
+    chunks: Iterator[bytes],
+    mode: Optional[int],
+) -> int:
+    """Atomically replaces a file.
+
+    The data is written to a temporary file in the same directory, which is
+    then renamed to the target file.
+
+    :param target: The file to replace.
+    :param chunks: The new content.
+    :param mode: The file mode. If this is ``None``, the mode of an existing
+    file is kept.
+
+    :return: the number of bytes written
+    """
+    if mode is None:
+        try:
+            mode = stat.S_IMODE(target.stat().st_mode)
+        except FileNotFoundError:
+            pass
+
+    temporary = target.parent / '.{}.{}'.format(target.name, uuid.uuid4().hex)
+    fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        written = 0
+        with os.fdopen(fd, 'wb') as f:
+            for buffer in chunks:
+                f.write(buffer)
+                written += len(buffer)
+        if mode is not None:
+            os.chmod(temporary, mode)
+        os.replace(temporary, target)
+        return written
+    except:
+        os.unlink(temporary)
+        raise
+
+
+@lru_cache
+def _privileged_helper(command: str) -> privileged.Helper:
+    """Returns the helper for operations requiring raised privileges.
+
+    :param command: The command starting the helper. The tokens ``${python}``
+    and ``${script}`` are replaced by the current Python interpreter and the
+    helper script.
+
+    :return: a helper, which is stopped when the process exits
+    """
+    replacements = {
+        'python': sys.executable,
+        'script': privileged.__file__,
+    }
+    helper = privileged.Helper(
+        [
+            Twig.interpolate(arg, replacements.get)
+            for arg in shlex.split(command)
+        ]
+    )
+    atexit.register(helper.close)
+    return helper
+
+
+def _literal_prefix(pattern: str) -> str:
+    """Extracts the literal text at the start of a regular expression.
+
+    Every string matching the regular expression contains this text.
+
+    :param pattern: The regular expression.
+
+    :return: the literal prefix, which is empty if the regular expression
+        contains a top-level alternation
+    """
+    if _has_alternation(pattern):
+        return ''
+
+    result = []
+    i = 1 if pattern.startswith('^') else 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\' and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            c, i = pattern[i + 1], i + 2
+        elif c in REGEX_SPECIAL:
+            break
+        else:
+            i += 1
+
+        # A quantified character may be absent
+        if i < len(pattern) and pattern[i] in '*?{':
+            break
+        result.append(c)
+    return ''.join(result)
+
+
+def _has_alternation(pattern: str) -> bool:
+    """Determines whether a regular expression contains an alternation outside
+    of any group.
+
+    :param pattern: The regular expression.
+
+    :return: whether an unescaped ``|`` occurs outside of groups and character
+        classes
+    """
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            i += 1
+        elif c == '[':
+            # A closing bracket directly after the opening one is literal
+            i += 1
+            if i < len(pattern) and pattern[i] == '^':
+                i += 1
+            if i < len(pattern) and pattern[i] == ']':
+                i += 1
+            while i < len(pattern) and pattern[i] != ']':
+                if pattern[i] == '\\':
+                    i += 1
+                i += 1
+        elif c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == '|' and depth == 0:
+            return True
+        i += 1
+    return False
+
+
+def file_stamps(*paths: Path) -> List[Optional[List[int]]]:
+    """An input for completers that changes whenever any of a number of files
+    is modified.
+
+    :param paths: The files.
+
+    :return: the modification time and size of every file, or ``None`` for
+    missing files
+    """
+    result = []
+    for path in paths:
+        try:
+            s = os.stat(path)
+            result.append([s.st_mtime_ns, s.st_size])
+        except OSError:
+            result.append(None)
+    return result
+
+
+def period(seconds: float) -> int:
+    """An input for completers that changes once every period.
+
+    :param seconds: The length of the period.
+
+    :return: the index of the current period
+    """
+    return int(time.time() // seconds)
+
+
 def normalize(s: str) -> str:
     """Normalises a twig name.
 
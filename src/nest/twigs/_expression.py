@@ -1,76 +1,135 @@
 import ast
+import operator
 
-from functools import reduce
-from typing import Any, Callable, Dict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
 
+from ..platforms import Version
 
+#: The supported comparison operators.
+OPERATORS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+}
+
+
+@lru_cache(maxsize=None)
 def compile_expression(expression: str) -> Callable[[Dict[str, Any]], bool]:
     """Compiles an expression and returns a function to yield its value given
     an environment.
 
+    The expression is compiled to a tree of closures once, and the result is
+    memoised, so an expression used in several sections or files is only
+    compiled once.
+
+    Supported are ``and``, ``or``, ``not``, comparisons including ``in`` and
+    ``not in``, names from the environment and literals, including tuples,
+    lists and sets. A string literal compared to a :class:`Version` is
+    compared as a version, so ``version >= '24.04'`` works as expected.
+
     :param expression: The expression to evaluate.
 
     :return: a callable that yields a boolean
+
+    :raise ValueError: if the expression is invalid
     """
 
-    def inner(env):
-        def cmp(a, op, b):
-            match op:
-                case ast.Eq():
-                    return a == b
-                case ast.Gt():
-                    return a > b
-                case ast.GtE():
-                    return a >= b
-                case ast.Lt():
-                    return a < b
-                case ast.LtE():
-                    return a <= b
-                case _:
-                    raise ValueError('{} {} {}'.format(a, type(op).__name__, b))
-
-        def val(node):
-            match node:
-                case ast.BoolOp(op, values):
-                    match op:
-                        case ast.And():
-                            return reduce(
-                                lambda acc, v: acc and v,
-                                (val(v) for v in values),
-                                True,
-                            )
-                        case ast.Or():
-                            return reduce(
-                                lambda acc, v: acc or v,
-                                (val(v) for v in values),
-                                False,
-                            )
-                case ast.Compare(left, ops, comparators):
-                    return reduce(
-                        lambda acc, i: cmp(acc, *i),
-                        zip(ops, (val(c) for c in comparators)),
-                        val(left),
-                    )
-                case ast.Constant(value):
-                    return value
-                case ast.Name(n):
-                    try:
-                        return env[n]
-                    except KeyError:
-                        raise ValueError(
-                            'in "{}": unknown value "{}"'.format(expression, n)
-                        )
-                case _:
+    def name(n):
+        def inner(env):
+            try:
+                return env[n]
+            except KeyError:
+                raise ValueError(
+                    'in "{}": unknown value "{}"'.format(expression, n)
+                )
+
+        return inner
+
+    def compare(operands, ops, versions):
+        def inner(env):
+            a = operands[0](env)
+            for i, op in enumerate(ops):
+                b = operands[i + 1](env)
+                x, y = a, b
+                if versions[i + 1] is not None and isinstance(a, Version):
+                    y = versions[i + 1]
+                elif versions[i] is not None and isinstance(b, Version):
+                    x = versions[i]
+                if not op(x, y):
+                    return False
+                a = b
+            return True
+
+        return inner
+
+    def val(node):
+        match node:
+            case ast.BoolOp(ast.And(), values):
+                fs = tuple(val(v) for v in values)
+                return lambda env: all(f(env) for f in fs)
+            case ast.BoolOp(ast.Or(), values):
+                fs = tuple(val(v) for v in values)
+                return lambda env: any(f(env) for f in fs)
+            case ast.UnaryOp(ast.Not(), operand):
+                f = val(operand)
+                return lambda env: not f(env)
+            case ast.Compare(left, ops, comparators):
+                try:
+                    ops = tuple(OPERATORS[type(op)] for op in ops)
+                except KeyError:
                     raise ValueError(
-                        'in "{}": unknown expression "{}"'.format(
+                        'in "{}": unknown operator in "{}"'.format(
                             expression, ast.unparse(node)
                         )
                     )
-
-        return val(at.body)
+                return compare(
+                    tuple(val(c) for c in (left, *comparators)),
+                    ops,
+                    tuple(version(c) for c in (left, *comparators)),
+                )
+            case ast.Constant(value):
+                return lambda env: value
+            case ast.Tuple(elts) | ast.List(elts) | ast.Set(elts):
+                if all(isinstance(e, ast.Constant) for e in elts):
+                    value = tuple(e.value for e in elts)
+                    return lambda env: value
+                fs = tuple(val(e) for e in elts)
+                return lambda env: tuple(f(env) for f in fs)
+            case ast.Name(n):
+                return name(n)
+            case _:
+                raise ValueError(
+                    'in "{}": unknown expression "{}"'.format(
+                        expression, ast.unparse(node)
+                    )
+                )
 
     try:
         at = ast.parse(expression, mode='eval')
-        return inner
     except SyntaxError:
         raise ValueError('syntax error: {}'.format(expression))
+    return val(at.body)
+
+
+def version(node: ast.AST) -> Optional[Version]:
+    """Parses a string literal as a version.
+
+    :param node: The node to parse.
+
+    :return: a version, or ``None`` if the node is not a string literal
+        containing a version
+    """
+    match node:
+        case ast.Constant(str(value)):
+            try:
+                return Version(value)
+            except ValueError:
+                return None
+        case _:
+            return None
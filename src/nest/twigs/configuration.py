@@ -1,18 +1,33 @@
 import configparser
+import hashlib
+import os
 
 from functools import reduce
 from pathlib import Path
+from types import MappingProxyType
 from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Union
 
+from .. import state
 
-class Container:
-    def __init__(self, path: Optional[str], values: dict = {}):
-        from . import normalize
 
-        self._path = path
-        self._values = (
-            {normalize(k): v for (k, v) in values.items()} if values else None
-        )
+class Container:
+    def __init__(self, values: Optional[dict] = None):
+        if values is None:
+            self._children = {}
+            self._values = None
+        else:
+            from . import normalize
+
+            self._children = {
+                normalize(k): Container(v) if isinstance(v, dict) else Value(v)
+                for (k, v) in values.items()
+            }
+            self._values = MappingProxyType(
+                {
+                    k: v._values if isinstance(v, Container) else v._value
+                    for (k, v) in self._children.items()
+                }
+            )
 
     def __call__(self, default: str = None) -> str:
         if default is not None:
@@ -21,32 +36,20 @@ class Container:
             return self._values
 
     def __iter__(self):
-        if self._values is not None:
-            return iter(self._values)
-        else:
-            return iter(())
+        return iter(self._children)
 
     def __contains__(self, k: str):
         from . import normalize
 
-        return self._values is not None and normalize(k) in self._values
+        return k in self._children or normalize(k) in self._children
 
     def __getattr__(self, key: str) -> Any:
         from . import normalize
 
-        key = normalize(key)
-        if self._path is not None:
-            path = '{}.{}'.format(self._path, key)
-        else:
-            path = key
         try:
-            v = self._values[key]
-            if not isinstance(v, dict) or v is None:
-                return Value(v)
-            else:
-                return Container(path, v)
-        except (KeyError, TypeError):
-            return Container(path)
+            return self._children[key]
+        except KeyError:
+            return self._children.get(normalize(key), EMPTY)
 
     def __getitem__(self, key: str) -> Any:
         return self.__getattr__(key)
@@ -69,6 +72,10 @@ class Value:
         return repr(self._value)
 
 
+#: The container returned for missing keys.
+EMPTY = Container()
+
+
 class Configuration:
     #: The string separating a section name from its predicates.
     SEPARATOR = '::'
@@ -81,6 +88,10 @@ class Configuration:
     #: submodules.
     SUBMODULES_SECTION = 'submodules'
 
+    #: The version of the cached format. Increment this when the parsing rules
+    #: change to invalidate existing caches.
+    CACHE_VERSION = 4
+
     def __init__(self, gitmodules: Path, *filenames: Path, **env):
         """Initialises a configuration object.
 
@@ -88,13 +99,65 @@ class Configuration:
         values. The format of a configuration file resembles a plain INI file,
         but it supports additional metadata in the section headers.
 
+        The applicable sections are compiled into a flat mapping from dotted
+        and normalised keys to values. If a cache name is passed, this mapping
+        is persisted, and it is reused without parsing the files as long as the
+        files and the values are unchanged.
+
         :param gitmodules: A file containing a listing of submodules.
 
         :param filenames: The source files. Non-existing files are simply
             ignored: it is not an error to pass invalid file names as per the
             specification in :meth:`configparser.ConfigParser.read`.
 
-        :param values: Distribution specific values.
+        :param values: Distribution specific values. The value ``_cache`` is
+            not passed to expressions, but is the name of the state in which
+            to cache the compiled configuration.
+        """
+        cache = env.pop('_cache', None)
+        if cache is not None:
+            key = self._cache_key((gitmodules, *filenames), env)
+            cached = state.load(cache, {})
+        else:
+            key, cached = None, {}
+
+        if key is not None and cached.get('key') == key:
+            flat = cached['values']
+        else:
+            flat = self._flatten(self._read(gitmodules, filenames, env))
+            if cache is not None:
+                state.store(cache, {'key': key, 'values': flat})
+
+        data = self._unflatten(flat)
+        data[self.ENV_SECTION] = {k: v for k, v in env.items() if k[0] != '_'}
+        data[self.SUBMODULES_SECTION] = [
+            Path(p) for p in data.get(self.SUBMODULES_SECTION, [])
+        ]
+        self._data = Container(data)
+
+    def __getattr__(self, key: str) -> Union[Container, Any]:
+        return self._data[key]
+
+    def __getitem__(self, key: str) -> Any:
+        from . import normalize
+
+        return self.__getattr__(normalize(key))
+
+    def __repr__(self) -> str:
+        return repr(self._data)
+
+    def _read(
+        self, gitmodules: Path, filenames: Sequence[Path], env: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Reads all configuration files.
+
+        :param gitmodules: A file containing a listing of submodules.
+
+        :param filenames: The source files.
+
+        :param env: Distribution specific values.
+
+        :return: the applicable sections as nested mappings
         """
 
         def merge(a, b):
@@ -108,9 +171,8 @@ class Configuration:
         submodules = configparser.ConfigParser()
         submodules.read(gitmodules)
         data = {
-            self.ENV_SECTION: {k: v for k, v in env.items() if k[0] != '_'},
             self.SUBMODULES_SECTION: [
-                gitmodules.parent / submodules[section]['path']
+                str(gitmodules.parent / submodules[section]['path'])
                 for section in submodules.sections()
             ],
         }
@@ -127,18 +189,76 @@ class Configuration:
                 else:
                     data[section] = merge(data.get(section, {}), values)
 
-        self._data = Container(None, data)
+        return data
 
-    def __getattr__(self, key: str) -> Union[Container, Any]:
-        return self._data[key]
+    def _cache_key(
+        self, filenames: Sequence[Path], env: Dict[str, Any]
+    ) -> Sequence[Any]:
+        """Calculates the key identifying a cached configuration.
 
-    def __getitem__(self, key: str) -> Any:
-        from . import normalize
+        :param filenames: All files read.
 
-        return self.__getattr__(normalize(key))
+        :param env: Distribution specific values.
 
-    def __repr__(self) -> str:
-        return repr(self._data)
+        :return: a value that can be serialised as JSON
+        """
+        files = []
+        for filename in filenames:
+            try:
+                with open(filename, 'rb') as f:
+                    files.append(
+                        [
+                            str(filename),
+                            os.fstat(f.fileno()).st_mtime_ns,
+                            hashlib.sha256(f.read()).hexdigest(),
+                        ]
+                    )
+            except OSError:
+                files.append([str(filename), None, None])
+
+        return [
+            self.CACHE_VERSION,
+            files,
+            sorted([k, repr(v)] for (k, v) in env.items()),
+        ]
+
+    @staticmethod
+    def _flatten(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Converts nested mappings to a mapping from dotted keys.
+
+        Empty mappings are kept as values, so that the sections still exist.
+
+        :param data: The nested mappings. All keys must be normalised.
+
+        :return: a flat mapping
+        """
+
+        def inner(prefix, values):
+            for k, v in values.items():
+                path = k if prefix is None else '{}.{}'.format(prefix, k)
+                if isinstance(v, dict) and v:
+                    yield from inner(path, v)
+                else:
+                    yield path, v
+
+        return dict(inner(None, data))
+
+    @staticmethod
+    def _unflatten(flat: Dict[str, Any]) -> Dict[str, Any]:
+        """Converts a mapping from dotted keys to nested mappings.
+
+        :param flat: The flat mapping.
+
+        :return: nested mappings
+        """
+        result = {}
+        for path, v in flat.items():
+            *parents, key = path.split('.')
+            target = result
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[key] = v
+        return result
 
     def _extract_values(
         self, filename: str, values: Dict[str, Any]
@@ -158,9 +278,13 @@ class Configuration:
             return a[b]
 
         result = {}
+        from . import normalize
+
         for section, expression, entries in self._extract_sections(filename):
             if expression(values):
-                target = reduce(recurse, section.split('.'), result)
+                target = reduce(
+                    recurse, (normalize(p) for p in section.split('.')), result
+                )
                 target.update(entries)
 
         return result
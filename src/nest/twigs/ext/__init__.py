@@ -1 +1,2 @@
 from . import github as github
+from . import pypi as pypi
@@ -0,0 +1,405 @@
+import json
+import platform
+import re
+import sys
+import threading
+import urllib.error
+import urllib.request
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from nest import NestException, directories
+from nest.platforms import Version
+
+#: The default index URL.
+INDEX_URL = 'https://pypi.org/simple'
+
+#: The content type of the JSON form of the simple API.
+CONTENT_TYPE = 'application/vnd.pypi.simple.v1+json'
+
+#: The directory in which responses are cached.
+CACHE_PATH = directories.CACHE / 'nest' / 'pypi'
+
+#: The file extensions of source distributions.
+SDIST_EXTENSIONS = ('.tar.gz', '.tar.bz2', '.tgz', '.zip')
+
+#: The glibc versions of the legacy *manylinux* platform tags.
+MANYLINUX_ALIASES = {
+    'manylinux1': (2, 5),
+    'manylinux2010': (2, 12),
+    'manylinux2014': (2, 17),
+}
+
+#: A regular expression matching platform tags with a minimum version. The
+#: groups are the kind of the tag, the minimum version and the architecture.
+PLATFORM_RE = re.compile(r'(manylinux|musllinux|macosx)_(\d+)_(\d+)_(.+)')
+
+#: The architectures supported by the architecture names in *macOS* platform
+#: tags that do not name a single architecture.
+MACOS_ARCHITECTURES = {
+    'universal2': ('x86_64', 'arm64'),
+    'universal': ('x86_64', 'i386', 'ppc', 'ppc64'),
+    'intel': ('x86_64', 'i386'),
+    'fat': ('i386', 'ppc'),
+    'fat64': ('x86_64', 'ppc64'),
+}
+
+#: The *Windows* platform tags by machine type.
+WINDOWS_PLATFORMS = {
+    'amd64': 'win_amd64',
+    'x86': 'win32',
+    'arm64': 'win_arm64',
+}
+
+#: A regular expression matching a single ``Requires-Python`` specifier.
+SPECIFIER_RE = re.compile(r'^\s*(~=|===|==|!=|<=|>=|<|>)\s*([^\s]+)\s*$')
+
+
+class Client:
+    """A client for the JSON form of the simple repository API, as described
+    in PEP 691.
+
+    Responses are cached on disk along with their ``ETag``, so repeated queries
+    for a project only transfer data when the project has changed. Within a
+    single run, every project is retrieved at most once.
+    """
+
+    def __init__(
+        self,
+        index_url: str = INDEX_URL,
+        cache_path: Optional[Path] = CACHE_PATH,
+        python_version: Tuple[int, ...] = tuple(sys.version_info[:3]),
+        platform: Optional[Tuple[str, str, Tuple[int, ...]]] = None,
+    ):
+        """Initialises a client.
+
+        :param index_url: The base URL of the index.
+
+        :param cache_path: The directory in which to cache responses. If this
+        is ``None``, no responses are cached.
+
+        :param python_version: The Python version for which to find installable
+        versions.
+
+        :param platform: The platform for which to find installable versions,
+        as returned by :func:`current_platform`. If this is ``None``, the
+        running platform is used.
+        """
+        self._index_url = index_url.rstrip('/')
+        self._cache_path = cache_path
+        self._python_version = python_version
+        self._platform = platform or current_platform()
+        self._projects = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def project(self, name: str) -> Dict[str, Any]:
+        """Retrieves the project description for a project.
+
+        :param name: The project name.
+
+        :return: the project description
+
+        :raise NestException: if the project cannot be retrieved
+        """
+        name = canonicalize(name)
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._projects:
+                self._projects[name] = self._fetch(name)
+            return self._projects[name]
+
+    def versions(self, name: str, prereleases: bool = False) -> List[str]:
+        """Lists the installable versions of a project.
+
+        A version is installable if it has at least one file that is not
+        yanked, that supports the Python version of this client and that is
+        either a source distribution or a compatible wheel.
+
+        :param name: The project name.
+
+        :param prereleases: Whether to include pre-releases and development
+        releases.
+
+        :return: a list of versions, sorted with the most recent first
+        """
+        result = {}
+        for f in self.project(name).get('files', []):
+            version = _file_version(f['filename'])
+            if version is None or version in result:
+                continue
+            try:
+                parsed = Version(version)
+            except ValueError:
+                continue
+            if (
+                f.get('yanked', False)
+                or (not prereleases and parsed.is_prerelease)
+                or not self._is_compatible(f)
+            ):
+                continue
+            result[version] = parsed
+
+        return sorted(result, key=result.__getitem__, reverse=True)
+
+    def latest_version(
+        self, name: str, prereleases: bool = False
+    ) -> Optional[str]:
+        """Determines the latest installable version of a project.
+
+        :param name: The project name.
+
+        :param prereleases: Whether to consider pre-releases and development
+        releases.
+
+        :return: a version, or ``None`` if no version is installable
+        """
+        return next(iter(self.versions(name, prereleases)), None)
+
+    def _fetch(self, name: str) -> Dict[str, Any]:
+        """Retrieves a project description from the index, using the cache if
+        possible.
+
+        :param name: The canonical project name.
+
+        :return: the project description
+        """
+        url = '{}/{}/'.format(self._index_url, name)
+        cache_file = (
+            self._cache_path / '{}.json'.format(name)
+            if self._cache_path is not None
+            else None
+        )
+        try:
+            cached = json.loads(cache_file.read_text())
+            if cached['url'] != url:
+                cached = None
+        except:
+            cached = None
+
+        headers = {'Accept': CONTENT_TYPE}
+        if cached is not None and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+
+        try:
+            request = urllib.request.Request(url, headers=headers)
+            with urllib.request.urlopen(request) as c:
+                data = json.loads(c.read().decode('utf-8'))
+                etag = c.headers.get('ETag')
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and cached is not None:
+                return cached['data']
+            raise NestException(
+                'failed to retrieve "{}": HTTP status {}', url, e.code
+            )
+        except urllib.error.URLError as e:
+            raise NestException('failed to retrieve "{}": {}', url, e.reason)
+
+        if cache_file is not None and etag is not None:
+            try:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                cache_file.write_text(
+                    json.dumps({'url': url, 'etag': etag, 'data': data})
+                )
+            except OSError:
+                pass
+
+        return data
+
+    def _is_compatible(self, f: Dict[str, Any]) -> bool:
+        """Determines whether a file can be installed by the Python version of
+        this client.
+
+        :param f: The file description.
+
+        :return: whether the file is compatible
+        """
+        requires_python = f.get('requires-python')
+        if requires_python and not python_matches(
+            requires_python, self._python_version
+        ):
+            return False
+
+        filename = f['filename']
+        if not filename.endswith('.whl'):
+            return filename.endswith(SDIST_EXTENSIONS)
+
+        major, minor = self._python_version[:2]
+        try:
+            *_, python_tag, abi_tag, platform_tag = filename[:-4].split('-')
+        except ValueError:
+            return False
+        if not any(
+            platform_matches(tag, self._platform)
+            for tag in platform_tag.split('.')
+        ):
+            return False
+        for tag in python_tag.split('.'):
+            if tag in (
+                'py{}'.format(major),
+                'py{}{}'.format(major, minor),
+                'cp{}{}'.format(major, minor),
+            ):
+                return True
+            elif (
+                abi_tag == 'abi3'
+                and tag.startswith('cp{}'.format(major))
+                and tag[3:].isdigit()
+                and int(tag[3:]) <= minor
+            ):
+                return True
+        return False
+
+
+def canonicalize(name: str) -> str:
+    """Converts a project name to its canonical form, as described in PEP 503.
+
+    :param name: The project name.
+
+    :return: a canonical project name
+    """
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def current_platform() -> Tuple[str, str, Tuple[int, ...]]:
+    """Describes the running platform.
+
+    :return: the tuple ``(system, machine, version)``, where ``system`` is
+    :data:`sys.platform`, ``machine`` is the lower case machine type, and
+    ``version`` is the *glibc* version on *Linux*, the system version on
+    *macOS* and otherwise empty
+    """
+    if sys.platform == 'darwin':
+        version = platform.mac_ver()[0]
+    elif sys.platform == 'linux':
+        libc, version = platform.libc_ver()
+        if libc != 'glibc':
+            version = ''
+    else:
+        version = ''
+    try:
+        version = tuple(int(p) for p in version.split('.'))
+    except ValueError:
+        version = ()
+    return sys.platform, platform.machine().lower(), version
+
+
+def platform_matches(
+    tag: str, platform: Tuple[str, str, Tuple[int, ...]]
+) -> bool:
+    """Determines whether a wheel platform tag matches a platform.
+
+    On *Linux*, *musllinux* tags only match when *glibc* is not used.
+
+    :param tag: The platform tag, such as ``'manylinux_2_17_x86_64'``.
+
+    :param platform: The platform, as returned by :func:`current_platform`.
+
+    :return: whether wheels with this tag can be installed on the platform
+    """
+    system, machine, version = platform
+    if tag == 'any':
+        return True
+    elif system == 'win32':
+        return tag == WINDOWS_PLATFORMS.get(machine)
+    elif system == 'linux' and tag == 'linux_{}'.format(machine):
+        return True
+
+    for alias, (major, minor) in MANYLINUX_ALIASES.items():
+        if tag.startswith(alias + '_'):
+            tag = 'manylinux_{}_{}_{}'.format(
+                major, minor, tag[len(alias) + 1 :]
+            )
+    m = PLATFORM_RE.fullmatch(tag)
+    if m is None:
+        return False
+    kind, minimum, architecture = (
+        m.group(1),
+        (int(m.group(2)), int(m.group(3))),
+        m.group(4),
+    )
+
+    if system == 'linux' and architecture == machine:
+        if kind == 'manylinux':
+            return bool(version) and minimum <= version
+        elif kind == 'musllinux':
+            return not version
+    elif system == 'darwin' and kind == 'macosx':
+        return machine in MACOS_ARCHITECTURES.get(
+            architecture, (architecture,)
+        ) and minimum <= version
+    return False
+
+
+def python_matches(specification: str, version: Tuple[int, ...]) -> bool:
+    """Determines whether a Python version matches a ``Requires-Python``
+    specification.
+
+    Specifiers that cannot be parsed are ignored.
+
+    :param specification: A comma separated list of version specifiers.
+
+    :param version: The Python version.
+
+    :return: whether the version matches
+    """
+
+    def parse(s):
+        return tuple(int(p) for p in s.split('.'))
+
+    def compare(op, a, b):
+        length = max(len(a), len(b))
+        a, b = a + (0,) * (length - len(a)), b + (0,) * (length - len(b))
+        return {
+            '===': a == b,
+            '==': a == b,
+            '!=': a != b,
+            '<=': a <= b,
+            '>=': a >= b,
+            '<': a < b,
+            '>': a > b,
+        }[op]
+
+    for specifier in specification.split(','):
+        m = SPECIFIER_RE.match(specifier)
+        if m is None:
+            continue
+        op, other = m.groups()
+        try:
+            wildcard = other.endswith('.*')
+            other = parse(other[:-2] if wildcard else other)
+        except ValueError:
+            continue
+
+        if wildcard:
+            matches = version[: len(other)] == other
+            if matches != (op == '=='):
+                return False
+        elif op == '~=':
+            if not compare('>=', version, other) or (
+                version[: len(other) - 1] != other[:-1]
+            ):
+                return False
+        elif not compare(op, version, other):
+            return False
+
+    return True
+
+
+def _file_version(filename: str) -> Optional[str]:
+    """Extracts the version from the name of a distribution file.
+
+    :param filename: The file name.
+
+    :return: a version string, or ``None`` if the file name is not recognised
+    """
+    if filename.endswith('.whl'):
+        parts = filename.split('-')
+        return parts[1] if len(parts) >= 5 else None
+    for extension in SDIST_EXTENSIONS:
+        if filename.endswith(extension):
+            stem = filename[: -len(extension)]
+            return stem.rsplit('-', 1)[1] if '-' in stem else None
+    return None
@@ -3,10 +3,12 @@ import math
 import os
 import shutil
 import sys
+import threading
+import time
 
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Callable, List, Optional, Tuple
+from typing import Any, Callable, List, Optional, Sequence, Tuple
 
 from nest.twigs import Twig
 
@@ -24,6 +26,13 @@ __INDENT = int(os.getenv('NEST_INDENT', '0'))
 #: Delayed section headers.
 __HEADERS: List[Tuple[int, str]] = []
 
+#: The maximum number of times per second progress bars are redrawn.
+PROGRESS_FRAME_RATE = 20
+
+#: The interval, in seconds, between progress lines when not writing to a
+#: terminal.
+PROGRESS_PLAIN_INTERVAL = 5.0
+
 
 def link(twig: Twig, source: Path, target: Path, rel: Path):
     """Attempts to link a file.
@@ -96,6 +105,49 @@ def link(twig: Twig, source: Path, target: Path, rel: Path):
         twig.link(source, target)
 
 
+def link_all(twig: Twig, source: Path, target: Path, rels: Sequence[Path]):
+    """Attempts to link several files.
+
+    This is an interactive function.
+
+    Every target directory is read only once to find the files already linked
+    to the correct file, and only the remaining files are passed to
+    :func:`link`.
+
+    :param twig: The twig performing the linking.
+    :param source: The source directory.
+    :param target: The target directory for files.
+    :param rels: The file names, relative to the source directory.
+    """
+    # Work on strings, since creating paths costs more than the system calls
+    source_root = str(Path(source).absolute())
+    target_root = str(Path(target).absolute())
+    links = {}
+    for rel in rels:
+        directory, name = os.path.split(str(rel))
+        if directory not in links:
+            path = os.path.join(target_root, directory)
+            try:
+                with os.scandir(path) as entries:
+                    links[directory] = {
+                        entry.name: entry
+                        for entry in entries
+                        if entry.is_symlink()
+                    }
+            except OSError:
+                links[directory] = {}
+
+        entry = links[directory].get(name)
+        try:
+            linked = entry is not None and (
+                os.readlink(entry) == os.path.join(source_root, str(rel))
+            )
+        except OSError:
+            linked = False
+        if not linked:
+            link(twig, source, target, rel)
+
+
 def unlink(twig: Twig, source: Path, target: Path, rel: Path):
     """Attempts to unlink a file.
 
@@ -193,45 +245,24 @@ def tree(
 
 
 @contextmanager
-def progress():
-    """Draws a progress bar at the bottom of the terminal."""
-    previous = 0
-
-    def clear():
-        sys.stdout.write('\33[2K\r')
-
-    def inner(v: float):
-        if v > 1.0:
-            v = 1.0
-        elif v < 0.0:
-            v = 0.0
-
-        # Clear only when regressing
-        nonlocal previous
-        if v < previous:
-            clear()
-        else:
-            sys.stdout.write('\r')
-        previous = v
-
-        width = v * (shutil.get_terminal_size().columns - 1)
-
-        sys.stdout.write('\033[0;32m')
-        sys.stdout.write('█' * math.floor(width))
-        fract = width % 1
-        if fract > 0:
-            partials = '▏▎▍▌▋▊▉'
-            sys.stdout.write(partials[math.floor(fract * len(partials))])
-        sys.stdout.write('\033[0m')
-        sys.stdout.flush()
+def progress(label: Optional[str] = None):
+    """Draws a progress bar at the bottom of the terminal.
 
-    sys.stdout.write('\033[?25l')
+    Several progress bars may be active at the same time, for example from
+    different threads; they are drawn below each other. Updates are coalesced,
+    so the bars are redrawn at most :data:`PROGRESS_FRAME_RATE` times per
+    second.
+
+    If standard output is not a terminal, the progress is instead printed as a
+    line of text every :data:`PROGRESS_PLAIN_INTERVAL` seconds.
+
+    :param label: A label for the progress bar.
+    """
+    bar = _PROGRESS.add(label, INDENT * __INDENT)
     try:
-        clear()
-        yield inner
+        yield lambda v: _PROGRESS.update(bar, v)
     finally:
-        clear()
-        sys.stdout.write('\033[?25h')
+        _PROGRESS.remove(bar)
 
 
 @contextmanager
@@ -338,12 +369,13 @@ def log(s: str):
     :param s: The item to display.
     """
     global __INDENT, __HEADERS
-    for item in __HEADERS:
-        if item is not None:
-            i, header = item
-            print('{}{}'.format(INDENT * i, header))
-    __HEADERS = []
-    print('{}{}'.format(INDENT * __INDENT, s))
+    with _PROGRESS.hidden():
+        for item in __HEADERS:
+            if item is not None:
+                i, header = item
+                print('{}{}'.format(INDENT * i, header))
+        __HEADERS = []
+        print('{}{}'.format(INDENT * __INDENT, s))
 
 
 def _print(
@@ -405,3 +437,135 @@ def _print(
             # Print the remaining text
             print(current)
             current = ''
+
+
+class _Progress:
+    """The progress bars currently displayed."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._bars = {}
+        self._next = 0
+        self._lines = 0
+        self._drawn = 0.0
+        self._tty = False
+
+    def add(self, label: Optional[str], indent: str) -> int:
+        """Adds a progress bar.
+
+        :param label: The label of the bar.
+
+        :param indent: The indentation of text lines describing the progress.
+
+        :return: a key identifying the bar
+        """
+        with self._lock:
+            if not self._bars:
+                self._tty = sys.stdout.isatty()
+                if self._tty:
+                    sys.stdout.write('\033[?25l')
+            key = self._next
+            self._next += 1
+            self._bars[key] = [label, indent, 0.0, 0.0]
+            return key
+
+    def update(self, key: int, v: float):
+        """Updates the value of a progress bar.
+
+        :param key: The key identifying the bar.
+
+        :param v: The progress, between ``0.0`` and ``1.0``.
+        """
+        now = time.monotonic()
+        with self._lock:
+            bar = self._bars[key]
+            bar[2] = min(max(v, 0.0), 1.0)
+            if not self._tty:
+                if now - bar[3] >= PROGRESS_PLAIN_INTERVAL:
+                    bar[3] = now
+                    print(
+                        '{}{}{:.0%}'.format(
+                            bar[1],
+                            '{}: '.format(bar[0]) if bar[0] else '',
+                            bar[2],
+                        ),
+                        flush=True,
+                    )
+            elif now - self._drawn >= 1.0 / PROGRESS_FRAME_RATE:
+                self._drawn = now
+                self._clear()
+                self._draw()
+
+    def remove(self, key: int):
+        """Removes a progress bar.
+
+        :param key: The key identifying the bar.
+        """
+        with self._lock:
+            del self._bars[key]
+            if self._tty:
+                self._clear()
+                if self._bars:
+                    self._draw()
+                else:
+                    sys.stdout.write('\033[?25h')
+                    sys.stdout.flush()
+
+    @contextmanager
+    def hidden(self):
+        """A context manager to hide the progress bars while printing."""
+        with self._lock:
+            if self._lines:
+                self._clear()
+                try:
+                    yield
+                finally:
+                    self._draw()
+            else:
+                yield
+
+    def _clear(self):
+        """Removes the bars from the terminal, and leaves the cursor where the
+        first bar was drawn.
+        """
+        if self._lines > 1:
+            sys.stdout.write('\033[{}A'.format(self._lines - 1))
+        sys.stdout.write('\r\033[J')
+        self._lines = 0
+
+    def _draw(self):
+        """Draws all bars, starting at the current line.
+
+        The terminal size is read on every redraw, since it may change while
+        the bars are displayed.
+        """
+        columns = shutil.get_terminal_size().columns
+        labels = [label for (label, *_) in self._bars.values() if label]
+        label_width = min(
+            max((len(label) for label in labels), default=0),
+            columns // 3,
+        )
+
+        lines = []
+        for label, _, v, _ in self._bars.values():
+            line = []
+            if label_width:
+                line.append(
+                    '{:{w}.{w}} '.format(label or '', w=label_width)
+                )
+            width = v * (columns - 1 - len(''.join(line)))
+            line.append('\033[0;32m')
+            line.append('█' * math.floor(width))
+            fract = width % 1
+            if fract > 0:
+                partials = '▏▎▍▌▋▊▉'
+                line.append(partials[math.floor(fract * len(partials))])
+            line.append('\033[0m')
+            lines.append(''.join(line))
+        sys.stdout.write('\n'.join(lines))
+        sys.stdout.flush()
+        self._lines = len(lines)
+
+
+#: The progress bars currently displayed.
+_PROGRESS = _Progress()
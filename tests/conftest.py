@@ -0,0 +1,8 @@
+import sys
+
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+# The user interface must be imported before the twigs
+import nest.ui  # noqa: E402, F401
@@ -0,0 +1,87 @@
+import importlib
+import subprocess
+
+from types import SimpleNamespace
+
+import pytest
+
+from nest.twigs import wait
+
+git = importlib.import_module('nest.twigs.git')
+
+
+def run(cwd, *args):
+    subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True)
+
+
+def commit(cwd, subject):
+    run(cwd, 'commit', '--quiet', '--allow-empty', '-m', subject)
+
+
+@pytest.fixture
+def submodule(tmp_path, monkeypatch):
+    """A clone of a local bare repository whose default branch is ``trunk``,
+    and which has one commit not yet fetched by the clone.
+    """
+    for variable in ('AUTHOR', 'COMMITTER'):
+        monkeypatch.setenv('GIT_{}_NAME'.format(variable), 'Test')
+        monkeypatch.setenv('GIT_{}_EMAIL'.format(variable), 'test@example.com')
+    monkeypatch.setenv('GIT_CONFIG_GLOBAL', str(tmp_path / 'gitconfig'))
+    monkeypatch.setenv('GIT_CONFIG_NOSYSTEM', '1')
+
+    upstream = tmp_path / 'upstream.git'
+    work = tmp_path / 'work'
+    clone = tmp_path / 'clone'
+    run(tmp_path, 'init', '--quiet', '--bare', '-b', 'trunk', str(upstream))
+    run(tmp_path, 'clone', '--quiet', str(upstream), str(work))
+    commit(work, 'First commit')
+    run(work, 'push', '--quiet', 'origin', 'trunk')
+    run(tmp_path, 'clone', '--quiet', str(upstream), str(clone))
+    commit(work, 'Second commit')
+    commit(work, 'Third commit')
+    run(work, 'push', '--quiet', 'origin', 'trunk')
+    return clone
+
+
+def test_default_branch(submodule):
+    assert wait(git._default_branch(submodule, 'origin')) == 'origin/trunk'
+
+
+def test_default_branch_without_remote_head(submodule):
+    run(submodule, 'remote', 'set-head', 'origin', '--delete')
+
+    assert wait(git._default_branch(submodule, 'origin')) == 'origin/trunk'
+
+
+def test_default_branch_unreachable_remote(submodule, tmp_path):
+    run(submodule, 'remote', 'set-head', 'origin', '--delete')
+    run(submodule, 'remote', 'set-url', 'origin', str(tmp_path / 'missing'))
+    run(tmp_path, 'config', '--global', 'init.defaultBranch', 'main')
+
+    assert wait(git._default_branch(submodule, 'origin')) == 'origin/main'
+
+
+def test_pending_submodule_updates(submodule, monkeypatch):
+    monkeypatch.setattr(
+        git, 'SUBMODULE_TWIGS', [SimpleNamespace(enabled=True)]
+    )
+    monkeypatch.setattr(git, 'submodules', lambda _: [submodule])
+    git._pending_submodule_updates.cache_clear()
+    try:
+        assert git._pending_submodule_updates() == {
+            submodule: ['Third commit', 'Second commit'],
+        }
+    finally:
+        git._pending_submodule_updates.cache_clear()
+
+
+def test_pending_submodule_updates_disabled(submodule, monkeypatch):
+    monkeypatch.setattr(
+        git, 'SUBMODULE_TWIGS', [SimpleNamespace(enabled=False)]
+    )
+    monkeypatch.setattr(git, 'submodules', lambda _: [submodule])
+    git._pending_submodule_updates.cache_clear()
+    try:
+        assert git._pending_submodule_updates() == {}
+    finally:
+        git._pending_submodule_updates.cache_clear()
@@ -0,0 +1,69 @@
+import pytest
+
+from nest import __main__ as main, state
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    root = tmp_path / 'root'
+    home = tmp_path / 'home'
+    (root / 'files' / 'directory').mkdir(parents=True)
+    (root / 'files' / 'file').write_text('')
+    home.mkdir()
+    (home / 'directory').symlink_to(root / 'files' / 'directory')
+    (home / 'file').symlink_to(root / 'files' / 'file')
+    (home / 'removed').symlink_to(root / 'files' / 'removed')
+
+    monkeypatch.setattr(main, 'ROOT', root)
+    monkeypatch.setattr(state, 'PATH', tmp_path / 'state')
+    state.store(
+        main.LINKS_STATE,
+        [str(home / name) for name in ('directory', 'file', 'removed')],
+    )
+    return home
+
+
+def test_clean_keeps_directory_links(tree):
+    main.clean(tree, force=True, full_scan=False, prune=None)
+
+    assert (tree / 'directory').is_symlink()
+    assert (tree / 'file').is_symlink()
+    assert not (tree / 'removed').is_symlink()
+    assert state.load(main.LINKS_STATE) == [
+        str(tree / 'directory'),
+        str(tree / 'file'),
+    ]
+
+
+def test_clean_full_scan_keeps_directory_links(tree):
+    state.store(main.LINKS_STATE, [])
+    (tree / 'nested').mkdir()
+    for name in ('directory', 'removed'):
+        (tree / 'nested' / name).symlink_to(main.ROOT / 'files' / name)
+
+    main.clean(tree, force=True, full_scan=True, prune=None)
+
+    assert (tree / 'directory').is_symlink()
+    assert (tree / 'nested' / 'directory').is_symlink()
+    assert not (tree / 'removed').is_symlink()
+    assert not (tree / 'nested' / 'removed').is_symlink()
+    assert state.load(main.LINKS_STATE) == [
+        str(tree / 'directory'),
+        str(tree / 'file'),
+        str(tree / 'nested' / 'directory'),
+    ]
+
+
+def test_scan_links_missing_target(tmp_path):
+    assert list(main._scan_links(tmp_path / 'missing', main.PRUNE)) == []
+
+
+def test_scan_links_prune(tree):
+    (tree / 'node_modules').mkdir()
+    (tree / 'node_modules' / 'link').symlink_to(main.ROOT / 'files' / 'file')
+
+    assert sorted(s.name for (s, _) in main._scan_links(tree, main.PRUNE)) == [
+        'directory',
+        'file',
+        'removed',
+    ]
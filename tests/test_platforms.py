@@ -0,0 +1,102 @@
+import pickle
+
+import pytest
+
+from nest.platforms import Version
+
+
+@pytest.mark.parametrize(
+    'versions',
+    [
+        # PEP 440
+        [
+            '1.0.dev1',
+            '1.0a1.dev1',
+            '1.0a1',
+            '1.0a1.post1.dev1',
+            '1.0a1.post1',
+            '1.0b1',
+            '1.0rc1',
+            '1.0',
+            '1.0.post1.dev1',
+            '1.0.post1',
+            '1.1.dev1',
+            '1!0.1',
+        ],
+        # Semantic versioning
+        [
+            '1.0.0-alpha',
+            '1.0.0-alpha.1',
+            '1.0.0-alpha.beta',
+            '1.0.0-beta',
+            '1.0.0-beta.2',
+            '1.0.0-beta.11',
+            '1.0.0-rc.1',
+            '1.0.0',
+        ],
+        # Implicit post-releases
+        ['1.0', '1.0-1', '1.0-2', '1.0.post3', '1.1'],
+    ],
+)
+def test_order(versions):
+    parsed = [Version(v) for v in versions]
+    for a, b in zip(parsed, parsed[1:]):
+        assert a < b
+        assert b > a
+        assert a != b
+
+
+@pytest.mark.parametrize(
+    'a, b',
+    [
+        ('1.0', '1'),
+        ('1.0', (1, 0, 0)),
+        ('1.0-1', '1.0.post1'),
+        ('1.0.dev', '1.0.dev0'),
+        ('1.0.0+build.1', '1.0.0'),
+        ('v1.2', '1.2'),
+    ],
+)
+def test_equal(a, b):
+    assert Version(a) == Version(b)
+    assert hash(Version(a)) == hash(Version(b))
+
+
+def test_pre_release():
+    assert Version('1.0.0-1.2') < Version('1.0.0')
+    assert Version('1.0.0-0.3.7') < Version('1.0.0-alpha')
+
+
+def test_compare_string():
+    assert Version('24.04') >= '22.10'
+    assert Version('24.04') == '24.4'
+    assert Version('24.04') != 'not a version'
+
+
+def test_pickle():
+    v = Version('1.0a1')
+    assert pickle.loads(pickle.dumps(v)) == v
+    assert str(pickle.loads(pickle.dumps(v))) == '1.0a1'
+
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        Version('not a version')
+    with pytest.raises(ValueError):
+        Version(1.0)
+
+
+@pytest.mark.parametrize(
+    'version, expected',
+    [
+        ('1.0', False),
+        ('1.0.post1', False),
+        ('1.0-1', False),
+        ('1.0a1', True),
+        ('1.0.dev1', True),
+        ('1.0.post1.dev1', True),
+        ('1.0.0-rc.1', True),
+    ],
+)
+def test_is_prerelease(version, expected):
+    assert Version(version).is_prerelease == expected
@@ -0,0 +1,169 @@
+import http.server
+import json
+import threading
+
+import pytest
+
+from nest import NestException
+from nest.twigs.ext import pypi
+
+#: The platform for which versions are listed.
+PLATFORM = ('linux', 'x86_64', (2, 35))
+
+#: The projects served by the stand-in index.
+PROJECTS = {
+    'example-project': {
+        'name': 'example-project',
+        'files': [
+            {'filename': 'example_project-1.0.tar.gz'},
+            {'filename': 'example_project-1.1-py3-none-any.whl'},
+            {'filename': 'example_project-1.10.tar.gz'},
+            {
+                'filename': 'example_project-1.2.tar.gz',
+                'yanked': 'broken',
+            },
+            {
+                'filename': 'example_project-1.3.tar.gz',
+                'requires-python': '>=3.20',
+            },
+            {'filename': 'example_project-2.0rc1.tar.gz'},
+            {'filename': 'example_project-2.0.dev1.tar.gz'},
+            {
+                'filename': 'example_project-1.11-cp311-cp311-win_amd64.whl',
+            },
+            {
+                'filename': 'example_project-1.12-cp311-cp311-'
+                'manylinux_2_17_x86_64.manylinux2014_x86_64.whl',
+            },
+            {
+                'filename': 'example_project-1.13-cp311-cp311-'
+                'manylinux_2_38_x86_64.whl',
+            },
+            {
+                'filename': 'example_project-1.14-cp310-abi3-'
+                'musllinux_1_1_x86_64.whl',
+            },
+        ],
+    },
+}
+
+
+class Index(http.server.BaseHTTPRequestHandler):
+    """A stand-in for the simple repository API."""
+
+    #: The paths of all requests, along with their ETag.
+    requests = []
+
+    def do_GET(self):
+        name = self.path.strip('/')
+        etag = '"{}"'.format(name)
+        self.requests.append((self.path, self.headers.get('If-None-Match')))
+        if name not in PROJECTS:
+            self.send_response(404)
+            self.end_headers()
+        elif self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+        else:
+            data = json.dumps(PROJECTS[name]).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', pypi.CONTENT_TYPE)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def index_url():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Index)
+    thread = threading.Thread(
+        target=server.serve_forever, args=(0.01,), daemon=True
+    )
+    thread.start()
+    Index.requests = []
+    try:
+        yield 'http://127.0.0.1:{}/'.format(server.server_port)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def client(index_url, cache_path=None):
+    return pypi.Client(index_url, cache_path, (3, 11, 4), PLATFORM)
+
+
+def test_versions(index_url):
+    assert client(index_url).versions('Example.Project') == [
+        '1.12',
+        '1.10',
+        '1.1',
+        '1.0',
+    ]
+
+
+def test_versions_prereleases(index_url):
+    assert client(index_url).versions('example_project', True)[:3] == [
+        '2.0rc1',
+        '2.0.dev1',
+        '1.12',
+    ]
+
+
+def test_latest_version(index_url):
+    assert client(index_url).latest_version('example-project') == '1.12'
+    assert len(Index.requests) == 1
+
+
+def test_cache(index_url, tmp_path):
+    assert client(index_url, tmp_path).latest_version('example-project')
+    assert client(index_url, tmp_path).latest_version('example-project')
+    assert Index.requests == [
+        ('/example-project/', None),
+        ('/example-project/', '"example-project"'),
+    ]
+
+
+def test_missing_project(index_url):
+    with pytest.raises(NestException):
+        client(index_url).project('missing')
+
+
+@pytest.mark.parametrize(
+    'tag, platform, expected',
+    [
+        ('any', PLATFORM, True),
+        ('linux_x86_64', PLATFORM, True),
+        ('manylinux2014_x86_64', PLATFORM, True),
+        ('manylinux_2_35_x86_64', PLATFORM, True),
+        ('manylinux_2_36_x86_64', PLATFORM, False),
+        ('manylinux2014_aarch64', PLATFORM, False),
+        ('musllinux_1_1_x86_64', PLATFORM, False),
+        ('musllinux_1_1_x86_64', ('linux', 'x86_64', ()), True),
+        ('win_amd64', PLATFORM, False),
+        ('win_amd64', ('win32', 'amd64', ()), True),
+        ('macosx_10_9_universal2', ('darwin', 'arm64', (14, 5)), True),
+        ('macosx_11_0_x86_64', ('darwin', 'arm64', (14, 5)), False),
+        ('macosx_15_0_arm64', ('darwin', 'arm64', (14, 5)), False),
+    ],
+)
+def test_platform_matches(tag, platform, expected):
+    assert pypi.platform_matches(tag, platform) == expected
+
+
+@pytest.mark.parametrize(
+    'specification, expected',
+    [
+        ('>=3.8', True),
+        ('>=3.8, <3.11', False),
+        ('~=3.10', True),
+        ('==3.11.*', True),
+        ('!=3.11.*', False),
+        ('>=3.12', False),
+    ],
+)
+def test_python_matches(specification, expected):
+    assert pypi.python_matches(specification, (3, 11, 4)) == expected
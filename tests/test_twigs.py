@@ -0,0 +1,118 @@
+import io
+import os
+
+from pathlib import Path
+
+import pytest
+
+from nest import NestException
+from nest.twigs import TWIGS, Twig, _literal_prefix
+
+
+@pytest.mark.parametrize(
+    'pattern, prefix',
+    [
+        (r'^Progress: (?P<percent>\d+)%', 'Progress: '),
+        (r'abc+', 'abc'),
+        (r'ab?c', 'a'),
+        (r'a\.b\|c', 'a.b|c'),
+        (r'a[|]b', 'a'),
+        (r'ab(c|d)e', 'ab'),
+    ],
+)
+def test_literal_prefix(pattern, prefix):
+    assert _literal_prefix(pattern) == prefix
+
+
+@pytest.mark.parametrize(
+    'pattern',
+    [r'a|b', r'^Downloading|^Installing', r'ab(c|d)|e', r'(?i)abc', r'(a|b)'],
+)
+def test_literal_prefix_empty(pattern):
+    assert _literal_prefix(pattern) == ''
+
+
+class NonSeekable(io.RawIOBase):
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        return self._data.readinto(b)
+
+
+@pytest.fixture
+def twig(tmp_path, monkeypatch):
+    calls = []
+    twig = Twig(lambda *_: None, 'test', 'A test twig.', set(), tmp_path)
+    monkeypatch.setattr(
+        twig, '_privileged', lambda *args: calls.append(args), raising=False
+    )
+    twig.privileged_calls = calls
+    yield twig
+    TWIGS.remove(twig)
+
+
+@pytest.fixture
+def read_only(monkeypatch):
+    """Denies creating temporary files next to the targets."""
+    os_open = os.open
+
+    def denied(path, *args, **kwargs):
+        if os.path.basename(path).startswith('.'):
+            raise PermissionError(path)
+        return os_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, 'open', denied)
+
+
+def test_file_unchanged_chmod_denied(twig, tmp_path, monkeypatch):
+    target = tmp_path / 'target'
+    target.write_bytes(b'data')
+    target.chmod(0o644)
+
+    def denied(*args):
+        raise PermissionError()
+
+    monkeypatch.setattr(Path, 'chmod', denied)
+
+    assert twig.file(io.BytesIO(b'data'), target, 0o755) == 0
+    assert target.read_bytes() == b'data'
+    assert twig.privileged_calls == [('chmod', target, 0o755)]
+
+
+@pytest.mark.parametrize('source', [io.BytesIO, NonSeekable])
+def test_file_write_denied(twig, tmp_path, read_only, source):
+    target = tmp_path / 'target'
+    target.write_bytes(b'old data')
+
+    assert twig.file(source(b'new data'), target) == len(b'new data')
+    assert twig.privileged_calls == [('write', target, b'new data', None)]
+
+
+@pytest.mark.parametrize('source', [io.BytesIO, NonSeekable])
+def test_file(twig, tmp_path, source):
+    target = tmp_path / 'target'
+    target.write_bytes(b'old data')
+
+    assert twig.file(source(b'new data'), target) == len(b'new data')
+    assert twig.file(source(b'new data'), target) == 0
+    assert target.read_bytes() == b'new data'
+    assert twig.privileged_calls == []
+
+
+def test_run_returncodes(twig):
+    output = twig.run(
+        'sh',
+        '-c',
+        'cat; exit 1',
+        stdin=b'data',
+        capture=True,
+        interactive=False,
+        returncodes=(0, 1),
+    )
+    assert output == 'data'
+    with pytest.raises(NestException):
+        twig.run('sh', '-c', 'exit 2', returncodes=(0, 1), silent=True)
@@ -1,13 +1,36 @@
 """GNU Bourne Again SHell.
 """
 
+import sys
+
 from pathlib import Path
 
-from .. import system
+from nest import ROOT
+from .. import Twig, system
 
 
 #: A directory containing additional RC files read by bash on startup.
 RC_PATH = Path('~/.config/bash/rc.d').expanduser()
 
+#: RC files generated from templates in this twig, since they must refer to
+#: the nest root.
+TEMPLATES = ('nest-updates',)
+
 
 main = system.package()
+
+
+@main.silent_completer
+def complete(me: Twig):
+    for name in TEMPLATES:
+        me.template(
+            Path(__file__).parent / '{}.template'.format(name),
+            RC_PATH / name,
+            root=ROOT.absolute(),
+            python=sys.executable)
+
+
+@main.remover
+def remove(me: Twig):
+    for name in TEMPLATES:
+        me.unlink(RC_PATH / name)
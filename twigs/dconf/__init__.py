@@ -1,17 +1,25 @@
 """Simple configuration storage system.
 """
 
+import configparser
 import os
 import re
+import threading
 
 from dataclasses import dataclass
-from typing import Any, Dict, Optional, Sequence
+from typing import Any, Dict, List, Optional, Sequence
 
 from .. import Twig, caller_context, system, twig
 
 
 main = system.package()
 
+#: The snapshots of dconf directories shared by all twigs, by path.
+_SNAPSHOTS = {}
+
+#: The lock guarding the snapshots, held while a twig changes a snapshot.
+_LOCK = threading.RLock()
+
 
 @dataclass
 class KeyBinding:
@@ -30,6 +38,117 @@ class KeyBinding:
     command: str
 
 
+class Snapshot:
+    """An in-memory copy of a dconf directory.
+
+    The directory is read with a single ``dconf dump``, and any changes are
+    written back with a single ``dconf load`` when calling :meth:`commit`.
+
+    Directories below the root are named relative to the root without leading
+    and trailing ``'/'``; the root itself is named ``'/'``.
+
+    Use :func:`snapshot` to get the snapshot shared by all twigs. Once it has
+    been written, it is read again by the next call.
+    """
+    def __init__(self, me: Twig, path: str):
+        """Reads a directory.
+
+        :param me: The twig running the command. This will be used to print an
+        error message if the command fails.
+
+        :param path: The path to read. This must start and end with ``'/'``.
+        """
+        self._me = me
+        self._path = path
+        self._values = _parse(dump(me, path))
+        self._changes = {}
+
+    def directories(self, parent: str) -> List[str]:
+        """Lists all directories that are immediate children of a directory.
+
+        :param parent: The parent directory.
+
+        :return: a list of directories
+        """
+        prefix = parent.strip('/') + '/'
+        return [
+            directory
+            for directory in self._values
+            if directory.startswith(prefix)
+            and '/' not in directory[len(prefix):]]
+
+    def get(self, directory: str, key: str) -> Optional[str]:
+        """Reads a value.
+
+        :param directory: The directory containing the key.
+
+        :param key: The key name.
+
+        :return: a value in *GVariant* format, or ``None`` if it is not set
+        """
+        return self._values.get(directory, {}).get(key)
+
+    def set(self, directory: str, key: str, value: str):
+        """Writes a value.
+
+        The value is not written to dconf until :meth:`commit` is called.
+
+        :param directory: The directory containing the key.
+
+        :param key: The key name.
+
+        :param value: The value to write. This must be in a *GVariant* format.
+        """
+        if self.get(directory, key) != value:
+            self._values.setdefault(directory, {})[key] = value
+            self._changes.setdefault(directory, {})[key] = value
+
+    def reset(self, directory: str):
+        """Resets a directory.
+
+        Unlike :meth:`set`, this takes effect immediately.
+
+        :param directory: The directory to reset.
+        """
+        self._values.pop(directory, None)
+        self._changes.pop(directory, None)
+        reset(self._me, '{}{}/'.format(self._path, directory))
+        self._invalidate()
+
+    def commit(self):
+        """Writes all changes in a single transaction.
+        """
+        if self._changes:
+            load(self._me, self._path, _format(self._changes))
+            self._changes = {}
+            self._invalidate()
+
+    def _invalidate(self):
+        """Makes sure that the directory is read again by :func:`snapshot`.
+        """
+        with _LOCK:
+            if _SNAPSHOTS.get(self._path) is self:
+                del _SNAPSHOTS[self._path]
+
+
+def snapshot(path: str) -> Snapshot:
+    """Returns the snapshot of a directory shared by all twigs.
+
+    Hold :data:`_LOCK` while changing the snapshot, so that no other twig
+    changes it concurrently.
+
+    :param path: The path to read. This must start and end with ``'/'``.
+
+    :return: a snapshot
+    """
+    with _LOCK:
+        try:
+            return _SNAPSHOTS[path]
+        except KeyError:
+            result = _SNAPSHOTS[path] = Snapshot(main, path)
+            return result
+
+
 def keybindings(
         *bindings: KeyBinding,
         name: Optional[str]=None,
@@ -38,53 +157,70 @@ def keybindings(
 
     This twig will ensure that a set of global GNOME key bindings exist.
     """
-    path = '/org/gnome/settings-daemon/plugins/media-keys/custom-keybindings'
+    root = '/org/gnome/settings-daemon/plugins/media-keys/'
+    directory = 'custom-keybindings'
+    path = root + directory
     custom_bindings_re = re.compile(r'custom([0-9]+)')
 
     @twig(
         name=name,
         globals=globals or caller_context())
     def main(me: Twig):
-        for binding in list_missing(me):
-            index = max(
-                (
-                    int(custom_bindings_re.match(binding).group(1))
-                    for binding in list(me, '{}/'.format(path))
-                    if custom_bindings_re.match(binding)),
-                default=0) + 1
-            base = '{}/custom{}'.format(path, index)
-            write(me, '{}/name'.format(base), binding.name)
-            write(me, '{}/binding'.format(base), binding.binding)
-            write(me, '{}/command'.format(base), binding.command)
+        with _LOCK:
+            s = snapshot(root)
+            for binding in list_missing(me):
+                index = max(
+                    (
+                        int(m.group(1))
+                        for m in (
+                            custom_bindings_re.fullmatch(d.rsplit('/', 1)[-1])
+                            for d in s.directories(directory))
+                        if m),
+                    default=0) + 1
+                base = '{}/custom{}'.format(directory, index)
+                s.set(base, 'name', binding.name)
+                s.set(base, 'binding', binding.binding)
+                s.set(base, 'command', binding.command)
+            update_list(s)
+            s.commit()
 
     @main.checker
     def is_installed(me: Twig):
         return len(list_missing(me)) == 0
 
-    @main.completer
+    @main.silent_completer
     def complete(me: Twig):
-        write(me, path, '[{}]'.format(
-            ','.join(
-                '\'{}/{}\''.format(path, name)
-                for name in list(me, '{}/'.format(path)))))
+        with _LOCK:
+            s = snapshot(root)
+            update_list(s)
+            s.commit()
 
     @main.remover
     def remove(me: Twig):
-        for item in list(me, '{}/'.format(path)):
-            subpath = '{}/{}'.format(path, item)
-            name = read(me, '{}name'.format(subpath))
-            if any(name == binding.name for binding in bindings):
-                reset(me, subpath)
+        with _LOCK:
+            s = snapshot(root)
+            for d in s.directories(directory):
+                if any(s.get(d, 'name') == b.name for b in bindings):
+                    s.reset(d)
+            update_list(s)
+            s.commit()
 
     def list_missing(me):
+        s = snapshot(root)
         current_names = [
-            read(me, '{}/{}name'.format(path, binding))
-            for binding in list(me, '{}/'.format(path))]
+            s.get(d, 'name')
+            for d in s.directories(directory)]
         return [
             binding
             for binding in bindings
             if binding.name not in current_names]
 
+    def update_list(s: Snapshot):
+        s.set('/', directory, '[{}]'.format(
+            ', '.join(
+                '\'{}/{}/\''.format(path, d.rsplit('/', 1)[-1])
+                for d in s.directories(directory))))
+
     return main
 
 
@@ -159,6 +295,74 @@ def reset(me: Twig, path: str):
         interactive=False)
 
 
+def dump(me: Twig, path: str) -> str:
+    """Dumps a directory.
+
+    :param me: The twig running the command. This will be used to print an
+    error message if the command fails.
+
+    :param path: The path to dump. This must start and end with ``'/'``.
+
+    :return: the directory in a key file format
+    """
+    return _run(
+        me,
+        'dump', path,
+        capture=True,
+        interactive=False)
+
+
+def load(me: Twig, path: str, data: str):
+    """Loads values into a directory.
+
+    Keys not present in ``data`` are left unchanged.
+
+    :param me: The twig running the command. This will be used to print an
+    error message if the command fails.
+
+    :param path: The path to load into. This must start and end with ``'/'``.
+
+    :param data: The values in the key file format used by :func:`dump`.
+    """
+    return _run(
+        me,
+        'load', path,
+        stdin=data.encode('utf-8'),
+        interactive=False)
+
+
+def _parse(data: str) -> Dict[str, Dict[str, str]]:
+    """Parses the output of :func:`dump`.
+
+    :param data: The key file data.
+
+    :return: a mapping from directory to keys and values
+    """
+    parser = configparser.ConfigParser(
+        delimiters=('=',),
+        interpolation=None,
+        strict=False)
+    parser.optionxform = str
+    parser.read_string(data)
+    return {
+        section: dict(parser.items(section))
+        for section in parser.sections()}
+
+
+def _format(values: Dict[str, Dict[str, str]]) -> str:
+    """Formats values for :func:`load`.
+
+    :param values: A mapping from directory to keys and values.
+
+    :return: key file data
+    """
+    return '\n'.join(
+        '[{}]\n{}'.format(
+            directory,
+            ''.join('{}={}\n'.format(k, v) for (k, v) in keys.items()))
+        for (directory, keys) in values.items())
+
+
 def _run(me: Twig, *args: str, **kwargs: str) -> Any:
     """Runs dconf with apecific arguments.
 
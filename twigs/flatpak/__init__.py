@@ -6,18 +6,20 @@ import shlex
 
 import nest
 
-from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 from nest import directories
 
-from .. import Twig, caller_context, system, twig
+from .. import Twig, caller_context, period, shared, system, twig
 
 
 #: The base path for flatpaks.
 BASE_PATH = directories.VAR / 'app'
 
+#: How often to check for application updates, in seconds.
+UPDATE_CHECK_PERIOD = 24 * 60 * 60
+
 
 def _is_installed(me: Twig, flatpak: Twig) -> bool:
     """Returns whether a flatpak is present on the system.
@@ -29,11 +31,7 @@ def _is_installed(me: Twig, flatpak: Twig) -> bool:
     """
     binary = _binary(me, flatpak)
 
-    return flatpak.run(
-        'flatpak', 'info', '${flatpak}',
-        check=True,
-        silent=True,
-        flatpak=me.c.packages[flatpak.name].ref()) \
+    return _ref(me, flatpak) in _installed(me) \
         and binary.exists() \
         and all(t.exists() for t in _links(me, flatpak))
 
@@ -51,6 +49,7 @@ def _install(me: Twig, flatpak: Twig):
         check=True,
         silent=True,
         flatpak=_ref(me, flatpak))
+    _installed.cache_clear()
 
     for target, source in _links(me, flatpak).items():
         target.unlink(missing_ok=True)
@@ -84,17 +83,26 @@ def _remove(me: Twig, flatpak: Twig):
         check=True,
         silent=True,
         flatpak=_ref(me, flatpak))
+    _installed.cache_clear()
     binary.unlink(missing_ok=True)
 
 
 main = system.provider(system.package(), _is_installed, _install, _remove)
 
 
-@main.completer
+@main.silent_completer
 def completer(me: Twig) -> List[str]:
-    me.run(
-        'flatpak', 'update', '--user', '--noninteractive',
-        silent=True)
+    if _updates(me):
+        me.run(
+            'flatpak', 'update', '--user', '--noninteractive',
+            silent=True)
+        _installed.cache_clear()
+        _updates.cache_clear()
+
+
+@main.completer_inputs
+def completer_inputs(me: Twig):
+    return [period(UPDATE_CHECK_PERIOD)]
 
 
 def remote(
@@ -144,7 +152,7 @@ flathub = remote(
     url='https://flathub.org/repo/flathub.flatpakrepo').depends(main)
 
 
-@lru_cache
+@shared
 def _remotes(me: Twig) -> Dict[str, str]:
     """Generates a mapping from repository name to its URL.
 
@@ -161,6 +169,52 @@ def _remotes(me: Twig) -> Dict[str, str]:
         if line)
 
 
+@shared
+def _installed(me: Twig) -> Dict[str, str]:
+    """Generates a mapping from installed application to its version.
+
+    :param me: The twig running the command. This will be used to print an
+    error message if the command fails.
+
+    :return: a mapping from application ID to version
+    """
+    try:
+        return dict(
+            (line.split('\t') + [''])[:2]
+            for line in me.run(
+                'flatpak', 'list', '--user', '--app',
+                '--columns=application,version',
+                capture=True,
+                interactive=False).splitlines()
+            if line)
+    except (FileNotFoundError, nest.NestException):
+        return {}
+
+
+@shared
+def _updates(me: Twig) -> List[str]:
+    """Lists the applications with pending updates.
+
+    This only queries the remotes and is much cheaper than a full update.
+
+    :param me: The twig running the command. This will be used to print an
+    error message if the command fails.
+
+    :return: a list of application IDs
+    """
+    try:
+        return [
+            line.strip()
+            for line in me.run(
+                'flatpak', 'remote-ls', '--user', '--updates',
+                '--columns=application',
+                capture=True,
+                interactive=False).splitlines()
+            if line.strip()]
+    except (FileNotFoundError, nest.NestException):
+        return []
+
+
 def _ref(me: Twig, flatpak: Twig) -> str:
     """The flatpak package reference.
 
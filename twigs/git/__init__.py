@@ -1,12 +1,15 @@
 """The stupid content tracker.
 """
 
+import asyncio
+
 import nest
 
 from pathlib import Path
-from typing import Any, List
+from typing import Any, Dict, List, Sequence, Set
 
-from .. import Twig, system, twig
+from nest import state
+from .. import Twig, shared, system, twig, wait
 
 
 #: The git directory.
@@ -15,6 +18,19 @@ GIT_DIR = nest.ROOT / '.git'
 #: The work tree.
 WORK_TREE = nest.ROOT
 
+#: The maximum number of submodules fetched concurrently.
+FETCH_JOBS = 8
+
+#: The twigs updated by updating submodules.
+SUBMODULE_TWIGS = []
+
+#: The name of the state containing the submodule commits of the last
+#: successful synchronisation.
+SUBMODULES_STATE = 'submodules'
+
+#: The file mode of gitlinks in the index.
+GITLINK_MODE = '160000'
+
 
 main = system.package()
 
@@ -24,20 +40,11 @@ def with_submodules(me: Twig) -> Twig:
     """
     @me.update_lister
     def update_lister(me: Twig) -> List[str]:
+        pending = _pending_submodule_updates()
         return [
-            l.rstrip()
+            line
             for repopath in submodules(me)
-            for l in command(
-                me,
-                'submodule', '--quiet', 'foreach',
-                'if [ "$displaypath" = "${path}" ]; then '
-                '   git fetch --quiet; '
-                '   git log --format=format:%s '
-                '       HEAD.."$(git default-remote)/$(git default-branch)"; '
-                'fi',
-                capture=True,
-                path=repopath.relative_to(nest.ROOT),
-            ).splitlines()]
+            for line in pending.get(repopath, [])]
 
 
     @me.update_applier
@@ -52,18 +59,250 @@ def with_submodules(me: Twig) -> Twig:
                 'fi',
                 silent=True,
                 path=repopath.relative_to(nest.ROOT))
+        _pending_submodule_updates.cache_clear()
+
+    SUBMODULE_TWIGS.append(me)
+    return me
 
 
-    def submodules(me: Twig) -> List[Path]:
-        return [
-            nest.ROOT / p
-            for p in command(
+def submodules(me: Twig) -> List[Path]:
+    """Lists the submodules located in the user files of a twig.
+
+    :param me: The twig.
+
+    :return: a list of absolute submodule paths
+    """
+    return [
+        Path(p)
+        for p in me.configuration.submodules
+        if Path(p).is_relative_to(me.user_source)]
+
+
+@shared
+def _pending_submodule_updates() -> Dict[Path, List[str]]:
+    """Lists the commits not yet merged for every submodule of the enabled
+    twigs generated by :func:`with_submodules`.
+
+    All submodules are fetched concurrently, and the result is shared by all
+    twigs for the duration of the run.
+
+    :return: a mapping from absolute submodule path to commit subjects
+    """
+    paths = sorted({
+        repopath
+        for t in SUBMODULE_TWIGS
+        if t.enabled
+        for repopath in submodules(t)})
+
+    async def pending(
+            repopath: Path, jobs: asyncio.Semaphore) -> List[str]:
+        try:
+            remote = next(iter((await submodule_command(
+                main, repopath,
+                'remote',
+                capture=True)).split()), None)
+            if remote is None:
+                return []
+            async with jobs:
+                await submodule_command(
+                    main, repopath,
+                    'fetch', '--quiet', remote,
+                    silent=True)
+            return [
+                line.rstrip()
+                for line in (await submodule_command(
+                    main, repopath,
+                    'log', '--format=format:%s',
+                    'HEAD..{}'.format(
+                        await _default_branch(repopath, remote)),
+                    capture=True)).splitlines()]
+        except (FileNotFoundError, nest.NestException):
+            return []
+
+    async def pending_all() -> List[List[str]]:
+        jobs = asyncio.Semaphore(FETCH_JOBS)
+        return await asyncio.gather(*(pending(p, jobs) for p in paths))
+
+    return dict(zip(paths, wait(pending_all())))
+
+
+async def _default_branch(repopath: Path, remote: str) -> str:
+    """Determines the default branch of a submodule like ``git
+    default-branch``.
+
+    The default branch is read from ``refs/remotes/<remote>/HEAD``. If that is
+    not set, which is common for clones made by ``git submodule add``, the
+    remote is asked for its ``HEAD``, and as a last resort the configured
+    default branch name is used on the remote.
+
+    :param repopath: The absolute path of the submodule.
+
+    :param remote: The name of the remote, as listed by ``git default-remote``.
+
+    :return: the remote branch, such as ``origin/main``
+    """
+    try:
+        return (await submodule_command(
+            main, repopath,
+            'symbolic-ref', '--short', 'refs/remotes/{}/HEAD'.format(remote),
+            capture=True)).strip()
+    except nest.NestException:
+        pass
+
+    try:
+        for line in (await submodule_command(
+                main, repopath,
+                'ls-remote', '--symref', remote, 'HEAD',
+                capture=True)).splitlines():
+            if line.startswith('ref: refs/heads/') and line.endswith('\tHEAD'):
+                return '{}/{}'.format(
+                    remote, line[len('ref: refs/heads/'):-len('\tHEAD')])
+    except nest.NestException:
+        pass
+
+    return '{}/{}'.format(
+        remote,
+        (await submodule_command(
+            main, repopath,
+            'var', 'GIT_DEFAULT_BRANCH',
+            capture=True)).strip())
+
+
+def sync_submodules() -> List[str]:
+    """Updates all submodules whose recorded commit has changed since the last
+    successful synchronisation.
+
+    Submodules that have not been checked out are always updated. The
+    submodules are updated concurrently.
+
+    :return: the paths of the updated submodules, relative to the work tree
+    """
+    try:
+        current = repository().gitlinks
+    except (FileNotFoundError, nest.NestException):
+        return []
+
+    previous = state.load(SUBMODULES_STATE, {})
+    changed = sorted(
+        path
+        for (path, commit) in current.items()
+        if previous.get(path) != commit
+        or not (WORK_TREE / path / '.git').exists())
+    if changed and not command(
+            main,
+            'submodule', 'update', '--init', '--recursive',
+            '--jobs={}'.format(FETCH_JOBS),
+            '--', *changed,
+            check=True,
+            silent=True,
+            interactive=False,
+            cwd=WORK_TREE):
+        return []
+
+    if previous != current:
+        state.store(SUBMODULES_STATE, current)
+    return changed
+
+
+class Repository:
+    """A view of the index of this repository.
+
+    The index is read once when the view is created, and membership queries
+    are answered from memory.
+    """
+    def __init__(self, me: Twig):
+        """Reads the index.
+
+        :param me: The twig running the commands. This will be used to print
+        an error message if a command fails.
+        """
+        self._me = me
+        self._files = set()
+        self._gitlinks = {}
+        self._ignored = {}
+        for entry in command(
                 me,
-                'submodule', 'foreach', '--quiet', 'echo "$displaypath"',
-                capture=True).splitlines()
-            if (nest.ROOT / p).is_relative_to(me.user_source)]
+                'ls-files', '--stage', '-z',
+                capture=True,
+                interactive=False).split('\0'):
+            if entry:
+                mode, commit, _, path = entry.split(maxsplit=3)
+                self._files.add(path)
+                if mode == GITLINK_MODE:
+                    self._gitlinks[path] = commit
 
-    return me
+    def __contains__(self, path: Path) -> bool:
+        """Whether a file is tracked.
+
+        :param path: The path to the file. If it is not absolute, it is
+        relative to the work tree.
+        """
+        try:
+            return str(self._relative(path)) in self._files
+        except ValueError:
+            return False
+
+    @property
+    def gitlinks(self) -> Dict[str, str]:
+        """The commits recorded for all submodules.
+
+        This is a mapping from submodule path, relative to the work tree, to
+        commit.
+        """
+        return self._gitlinks
+
+    def is_ignored(self, path: Path) -> bool:
+        """Whether a path is ignored.
+
+        :param path: The path. If it is not absolute, it is relative to the
+        work tree.
+        """
+        return bool(self.ignored([path]))
+
+    def ignored(self, paths: Sequence[Path]) -> Set[Path]:
+        """Determines which of several paths are ignored.
+
+        All paths not yet known are checked with a single command, and the
+        results are remembered.
+
+        :param paths: The paths. Paths that are not absolute are relative to
+        the work tree.
+
+        :return: the ignored paths, relative to the work tree
+        """
+        paths = [self._relative(path) for path in paths]
+        unknown = sorted({p for p in paths if p not in self._ignored})
+        if unknown:
+            # check-ignore exits with 1 if no path is ignored
+            ignored = {
+                Path(p)
+                for p in command(
+                    self._me,
+                    'check-ignore', '--stdin', '-z',
+                    stdin=b''.join(bytes(p) + b'\0' for p in unknown),
+                    capture=True,
+                    interactive=False,
+                    returncodes=(0, 1)).split('\0')
+                if p}
+            self._ignored.update((p, p in ignored) for p in unknown)
+        return {p for p in paths if self._ignored[p]}
+
+    def _relative(self, path: Path) -> Path:
+        """Converts a path to one relative to the work tree.
+
+        :raise ValueError: if the path is not located in the work tree
+        """
+        path = Path(path)
+        return path.relative_to(WORK_TREE) if path.is_absolute() else path
+
+
+@shared
+def repository() -> Repository:
+    """The view of this repository, shared for the duration of the run.
+
+    :return: a repository view
+    """
+    return Repository(main)
 
 
 def is_versioned(me: Twig) -> bool:
@@ -76,13 +315,7 @@ def is_versioned(me: Twig) -> bool:
 
     :return: whether this twig is versioned
     """
-    return all(
-        command(
-            me,
-            'ls-files', '--error-unmatch', str(p),
-            check=True,
-            silent=True)
-        for p in me.implementation)
+    return all(p in repository() for p in me.implementation)
 
 
 def command(me: Twig, *args, **kwargs) -> Any:
@@ -93,3 +326,14 @@ def command(me: Twig, *args, **kwargs) -> Any:
         '--git-dir={}'.format(GIT_DIR),
         '--work-tree={}'.format(WORK_TREE),
         *args, **kwargs)
+
+
+async def submodule_command(
+        me: Twig, repopath: Path, *args, **kwargs) -> Any:
+    """Runs git asynchronously in a submodule of this repository.
+    """
+    return await me.arun(
+        'git',
+        '-C', str(repopath),
+        *args,
+        **kwargs)
@@ -8,7 +8,15 @@ import nest
 from functools import lru_cache
 from pathlib import Path
 
-from .. import Twig, caller_context, downloadable, java, system, twig
+from .. import (
+    Twig,
+    caller_context,
+    downloadable,
+    file_stamps,
+    java,
+    system,
+    twig,
+)
 
 
 #: The URL format of a module JAR.
@@ -73,4 +81,10 @@ def module(
             Path(repo_format.format(me.stored_version)),
             Path(target_format.format(me.stored_version)))
 
+    @main.completer_inputs
+    def completer_inputs(me: Twig):
+        return [
+            me.stored_version,
+            file_stamps(Path(target_format.format(me.stored_version)))]
+
     return main
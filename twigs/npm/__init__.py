@@ -10,7 +10,7 @@ import nest
 
 from pathlib import Path
 from argparse import _SubParsersAction
-from functools import lru_cache
+from itertools import chain
 from typing import Any, Dict, List, Optional, Set, Union
 
 from nest.platforms import Version
@@ -20,6 +20,7 @@ from .. import (
     NestException,
     bash,
     caller_context,
+    shared,
     system,
     twig,
 )
@@ -28,6 +29,12 @@ from .. import (
 #: The Rust compiler.
 BIN_NPM = 'npm'
 
+#: The environment variable overriding the global prefix.
+PREFIX_ENV = 'NPM_CONFIG_PREFIX'
+
+#: The package twigs.
+PACKAGES = []
+
 
 main = system.package()
 
@@ -61,13 +68,10 @@ def package(
         except NestException:
             return me.package
 
-    @lru_cache
     def versions(me: Twig) -> List[Optional[str]]:
         try:
-            return [json.loads(me.run(
-                BIN_NPM, 'outdate', '--global', '--json', me.package,
-                capture=True))[me.package]['latest']]
-        except (KeyError, NestException):
+            return [_outdated_packages()[me.package]['latest']]
+        except KeyError:
             return []
 
     @twig(
@@ -83,13 +87,15 @@ def package(
             specification=me.specification,
             check=True,
             silent=True)
+        _installed_packages.cache_clear()
 
     type(main).package = property(_package)
     type(main).specification = property(_specification)
+    PACKAGES.append(main)
 
     @main.checker
     def is_installed(me: Twig) -> bool:
-        version = _installed_packages(me).get(me.package, None)
+        version = _installed_packages().get(me.package, None)
         try:
             return version == me.stored_version
         except NestException:
@@ -106,6 +112,7 @@ def package(
                     silent=True)
             except FileNotFoundError:
                 pass
+            _installed_packages.cache_clear()
 
     @main.update_lister
     def update_lister(me: Twig) -> List[str]:
@@ -126,19 +133,72 @@ def package(
     return main
 
 
-@lru_cache
-def _installed_packages(me: Twig) -> Dict[str, str]:
-    """Lists all installed packages and their versions.
+@shared
+def _prefix() -> Optional[Path]:
+    """The global npm prefix.
 
-    :return: a mapping from package name to version
+    :return: the prefix, or ``None`` if npm is not available
     """
+    if os.getenv(PREFIX_ENV):
+        return Path(os.getenv(PREFIX_ENV))
     try:
-        return {
-            package: specification['version']
-            for (package, specification) in json.loads(me.run(
-                BIN_NPM, 'list', '--global', '--json',
-                capture=True))['dependencies'].items()}
+        return Path(main.run(
+            BIN_NPM, 'prefix', '--global',
+            capture=True,
+            interactive=False).strip())
     except (FileNotFoundError, NestException):
+        return None
+
+
+@shared
+def _installed_packages() -> Dict[str, str]:
+    """Lists all globally installed packages and their versions.
+
+    The package manifests are read directly from the global ``node_modules``
+    directory instead of running npm.
+
+    :return: a mapping from package name to version
+    """
+    prefix = _prefix()
+    if prefix is None:
+        return {}
+
+    result = {}
+    root = prefix / 'lib' / 'node_modules'
+    for path in chain(
+            root.glob('*/package.json'),
+            root.glob('@*/*/package.json')):
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+            result[data['name']] = data['version']
+        except (OSError, ValueError, KeyError):
+            pass
+    return result
+
+
+@shared
+def _outdated_packages() -> Dict[str, Dict[str, str]]:
+    """Lists outdated packages for all enabled package twigs.
+
+    A single query is made for all packages.
+
+    :return: a mapping from package name to a description of the installed,
+    wanted and latest versions
+    """
+    packages = sorted({t.package for t in PACKAGES if t.enabled})
+    if not packages:
+        return {}
+    try:
+        # npm outdated exits with a non-zero code if any package is
+        # outdated, so we cannot let run check the exit code
+        child = main.run(
+            BIN_NPM, 'outdated', '--global', '--json', *packages,
+            capture=True,
+            stream=True,
+            interactive=False)
+        stdout, _ = child.communicate()
+        return json.loads(stdout.decode('utf-8') or '{}')
+    except (FileNotFoundError, ValueError):
         return {}
 
 
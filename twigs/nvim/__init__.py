@@ -11,10 +11,12 @@ from typing import List
 
 from .. import (
     ROOT,
+    TWIGS,
     TWIG_PATH,
     Twig,
     as_mod,
     caller_context,
+    file_stamps,
     git,
     normalize,
     system,
@@ -32,6 +34,15 @@ def complete(me: Twig):
         '--cmd', 'try | helptags ALL | finally | q! | endtry')
 
 
+@main.completer_inputs
+def completer_inputs(me: Twig):
+    # Help tags change with nvim itself and with the set of plugins
+    return [
+        file_stamps(shutil.which('nvim') or 'nvim'),
+        git.repository().gitlinks,
+        sorted(t.name for t in TWIGS if t.enabled)]
+
+
 def plugin() -> Twig:
     """Defines a twig that is an nvim plugin.
     """
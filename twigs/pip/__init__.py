@@ -15,7 +15,9 @@ from .. import (
     as_mod,
     caller_context,
     downloadable,
+    ext,
     normalize,
+    shared,
     system,
     twig,
 )
@@ -31,8 +33,6 @@ INSTALL_PROGRESS = re.compile(r'Progress (?P<current>\d+) of (?P<max>\d+)')
 #: ``python -m pip list``
 PACKAGE_EXTRACTOR = re.compile(r'([^\s]+)\s+([^\s]+)')
 
-#: A format string to generate the URL for a package.
-PACKAGE_URL_FORMAT = 'https://pypi.org/pypi/{}/json'
 
 
 main = system.package()
@@ -42,6 +42,7 @@ def package(
     *,
     package: Optional[str]=None,
     description: Optional[str]=None,
+    prereleases: bool=False,
     globals: Optional[Dict[str, Any]]=None,
     **kwargs,
 ) -> Twig:
@@ -55,6 +56,8 @@ def package(
     :param description: A description of the package. If not specified, the
     docstring of the calling module is used.
 
+    :param prereleases: Whether to consider pre-releases when listing updates.
+
     :param globals: A value of the ``globals`` parameter pass on to ``twig``.
 
     :return: the twig
@@ -66,20 +69,19 @@ def package(
         return '{}=={}'.format(me.package, me.stored_version)
 
     @lru_cache
-    def latest_version(me: Twig) -> str:
-        data = me.web.json(PACKAGE_URL_FORMAT.format(me.name))
-        return data['info']['version']
+    def latest_version(me: Twig) -> Optional[str]:
+        return _index().latest_version(me.package, prereleases)
 
     @twig(
         description=description,
         globals=globals or caller_context(),
         **kwargs)
     def main(me: Twig):
-        assert_pip(me)
+        _assert_pip(me)
         me.run_progress(
             sys.executable, '-m', MOD, 'install',
             '--user', '--upgrade', '--progress-bar=raw',
-            *args(me),
+            *_args(),
             '${specification}',
             progress_re=INSTALL_PROGRESS,
             specification=me.specification)
@@ -87,6 +89,8 @@ def package(
     type(main).package = property(_package)
     type(main).specification = property(_specification)
 
+    main.batch_installer(_install_all)
+
     @main.checker
     def is_installed(me: Twig) -> bool:
         return _installed_packages().get(me.name, None) == me.stored_version
@@ -96,7 +100,7 @@ def package(
         if is_installed(me):
             _run(
                 me,
-                'uninstall', *args(), '${specification}',
+                'uninstall', *_args(), '${specification}',
                 check=True,
                 silent=True,
                 specification=me.specification)
@@ -114,22 +118,63 @@ def package(
         me.stored_version = latest_version(me)
         me.install()
 
-    def assert_pip(me: Twig):
-        """Asserts that the current version of pip supports the
-        ``--progress-bar=raw`` argument.
-        """
-        _, version_string, *_ = _run(me, '--version', capture=True).split()
-        version = tuple(int(v) for v in version_string.split('.'))
+    return main
 
-        # This argument was introduced in 24.1
-        if version < (24, 1):
-            _run(me, 'install', '--upgrade', *args(me), MOD, silent=True)
 
-    def args(me: Twig) -> List[str]:
-        global main
-        return shlex.split(main.c.additional_arguments(''))
+@lru_cache
+def _index() -> ext.pypi.Client:
+    """The package index client shared by all *Python pip* twigs.
 
-    return main
+    The index URL can be overridden with the ``index-url`` configuration value.
+
+    :return: a package index client
+    """
+    return ext.pypi.Client(main.c.index_url(ext.pypi.INDEX_URL))
+
+
+def _install_all(twigs: List[Twig]):
+    """Installs several *Python pip* twigs in a single invocation of pip.
+
+    This lets pip resolve all specifications together and reuse its session
+    and cache. If the combined installation fails, the twigs are installed one
+    by one to report the failing twig.
+
+    :param twigs: The twigs to install.
+    """
+    me = twigs[0]
+    _assert_pip(me)
+    if not me.run_progress(
+            sys.executable, '-m', MOD, 'install',
+            '--user', '--upgrade', '--progress-bar=raw',
+            *_args(),
+            *(t.specification for t in twigs),
+            progress_re=INSTALL_PROGRESS,
+            check=True):
+        for t in twigs:
+            t.install()
+    _installed_packages.cache_clear()
+
+
+def _assert_pip(me: Twig):
+    """Asserts that the current version of pip supports the
+    ``--progress-bar=raw`` argument.
+
+    :param me: The twig running the command.
+    """
+    _, version_string, *_ = _run(me, '--version', capture=True).split()
+    version = tuple(int(v) for v in version_string.split('.'))
+
+    # This argument was introduced in 24.1
+    if version < (24, 1):
+        _run(me, 'install', '--upgrade', *_args(), MOD, silent=True)
+
+
+def _args() -> List[str]:
+    """Additional arguments passed to pip when installing packages.
+
+    :return: a list of arguments
+    """
+    return shlex.split(main.c.additional_arguments(''))
 
 
 def _run(me: Twig, *args: str, **kwargs: str):
@@ -149,7 +194,7 @@ def _run(me: Twig, *args: str, **kwargs: str):
         sys.executable, '-m', MOD, *args, **kwargs)
 
 
-@lru_cache
+@shared
 def _installed_packages() -> Dict[str, str]:
     """Lists all installed packages and their versions.
 
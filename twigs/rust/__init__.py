@@ -20,6 +20,9 @@ from .. import (
     NestException,
     bash,
     caller_context,
+    file_stamps,
+    period,
+    shared,
     system,
     twig,
 )
@@ -44,6 +47,9 @@ VERSIONS_URL_FORMAT = 'https://crates.io/api/v1/crates/{}/versions'
 COMPONENT_METADATA_URL = 'https://static.rust-lang.org/' \
     'dist/channel-rust-stable.toml'
 
+#: How often to check for a new stable toolchain, in seconds.
+UPDATE_CHECK_PERIOD = 24 * 60 * 60
+
 #: A regular expression to extract the progress from cargo install.
 INSTALL_PROGRESS = re.compile(
     r'Building \[[^]]*\] (?P<current>\d*)/(?P<max>\d*):')
@@ -81,6 +87,13 @@ def completer(me: Twig) -> List[str]:
         pass
 
 
+@main.completer_inputs
+def completer_inputs(me: Twig):
+    return [
+        period(UPDATE_CHECK_PERIOD),
+        file_stamps(_qualify(BIN_RUSTUP))]
+
+
 @main.remover
 def remove(me: Twig):
     if is_installed(me):
@@ -158,7 +171,7 @@ def crate(
             features=','.join(features))
 
 
-    @main.completer
+    @main.silent_completer
     def completer(me: Twig):
         if completions is not None:
             path = completions_path(me)
@@ -287,7 +300,7 @@ def _qualify(binary: str):
         return binary
 
 
-@lru_cache
+@shared
 def _installed_crates() -> Dict[str, str]:
     """Lists all installed crates and their versions.
 
@@ -309,7 +322,7 @@ def _installed_crates() -> Dict[str, str]:
         return {}
 
 
-@lru_cache
+@shared
 def _installed_components() -> Set[str]:
     """Lists all installed components.
 
@@ -3,9 +3,9 @@
 import shlex
 import shutil
 
-from typing import Optional
+from typing import List, Optional, Set, Tuple
 
-from .. import Twig, caller_context, system, twig
+from .. import NestException, Twig, caller_context, shared, system, twig
 
 
 def _is_installed(me: Twig, package: Twig) -> bool:
@@ -16,32 +16,63 @@ def _is_installed(me: Twig, package: Twig) -> bool:
 
     :returns: whether the package exists
     """
-    return package.run(
-        'snap', 'list', '${snap}',
+    return _name(package) in _installed(me)
+
+
+def _install(me: Twig, package: Twig) -> bool:
+    """Installs a snap.
+
+    :param me: This twig.
+    :param package: The package twig.
+
+    :return: whether the snap is installed
+    """
+    if _is_installed(me, package):
+        return True
+    result = package.run(
+        'sudo', 'snap', 'install', *_flags(package), '${snap}',
         check=True,
         silent=True,
         snap=_name(package))
+    _installed.cache_clear()
+    return result
 
 
-def _install(me: Twig, package: Twig):
-    """Installs a snap.
+def _install_all(me: Twig, packages: List[Twig]) -> List[Twig]:
+    """Installs several snaps.
+
+    Snaps sharing the same flags are installed with a single command. If that
+    fails, they are installed one by one, so that a single failing snap does
+    not prevent the others from being installed.
 
     :param me: This twig.
-    :param package: The package twig.
+    :param packages: The package twigs.
+
+    :return: the package twigs installed
     """
-    if not _is_installed(me, package):
-        if main.c.packages[package.name].classic() == 'true':
-            package.run(
-                'sudo', 'snap', 'install', '--classic', '${snap}',
-                check=True,
-                silent=True,
-                snap=_name(package))
+    installed = []
+    groups = {}
+    for package in packages:
+        if _is_installed(me, package):
+            installed.append(package)
         else:
-            package.run(
-                'sudo', 'snap', 'install', '${snap}',
+            groups.setdefault(_flags(package), []).append(package)
+
+    for flags, group in groups.items():
+        if len(group) > 1 and me.run(
+                'sudo', 'snap', 'install', *flags,
+                *(_name(package) for package in group),
                 check=True,
-                silent=True,
-                snap=_name(package))
+                silent=True):
+            installed.extend(group)
+        else:
+            installed.extend(
+                package
+                for package in group
+                if _install(me, package))
+        _installed.cache_clear()
+
+    return installed
 
 
 def _remove(me: Twig, package: Twig):
@@ -55,6 +86,39 @@ def _remove(me: Twig, package: Twig):
         check=True,
         silent=True,
         snap=_name(package))
+    _installed.cache_clear()
+
+
+@shared
+def _installed(me: Twig) -> Set[str]:
+    """Lists the names of all installed snaps.
+
+    :param me: The twig running the command. This will be used to print an
+    error message if the command fails.
+
+    :return: a set of snap names
+    """
+    try:
+        return {
+            line.split()[0]
+            for line in me.run(
+                'snap', 'list',
+                capture=True,
+                interactive=False).splitlines()[1:]
+            if line.strip()}
+    except (FileNotFoundError, NestException):
+        return set()
+
+
+def _flags(package: Twig) -> Tuple[str, ...]:
+    """The flags to pass to ``snap install`` for a specific twig.
+
+    :param package: The package twig.
+    """
+    if main.c.packages[package.name].classic() == 'true':
+        return ('--classic',)
+    else:
+        return ()
 
 
 def _name(package: Twig) -> str:
@@ -65,4 +129,5 @@ def _name(package: Twig) -> str:
     return main.c.packages[package.name].name() or package.name
 
 
-main = system.provider(system.package(), _is_installed, _install, _remove)
+main = system.provider(
+    system.package(), _is_installed, _install, _remove, _install_all)
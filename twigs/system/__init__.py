@@ -6,7 +6,7 @@ import shutil
 
 from dataclasses import dataclass
 from functools import partial
-from typing import Any,Callable, Dict, Optional
+from typing import Any,Callable, Dict, List, Optional
 
 from nest import NestException
 
@@ -25,6 +25,11 @@ InstallCallback = Callable[['Self', Twig], None]
 #: A function to remove a package.
 RemoveCallback = Callable[['Self', Twig], None]
 
+#: A function to install several packages at once.
+#:
+#: The return value, if present, is the subset of packages actually installed.
+InstallAllCallback = Callable[['Self', List[Twig]], Optional[List[Twig]]]
+
 #: The package providers.
 PROVIDERS = []
 
@@ -109,6 +114,9 @@ def package(
                     *shlex.split(main.c.remove()),
                     package=main.c.packages[me.name](me.name))
 
+    package.batch_installer(_install_all)
+    package.batch_group(_batch_group)
+
     return package
 
 
@@ -116,7 +124,8 @@ def provider(
         me: Twig,
         is_installed: IsInstalledCallback,
         install: InstallCallback,
-        remove: RemoveCallback) -> Twig:
+        remove: RemoveCallback,
+        install_all: Optional[InstallAllCallback]=None) -> Twig:
     """Marks a twig as a package installer.
 
     :param me: The currently handled twig.
@@ -127,12 +136,17 @@ def provider(
     :param install: A callback to install a package.
 
     :param remove: A callback to remove a package.
+
+    :param install_all: A callback to install several packages at once. If not
+    specified, packages are installed one by one. It may return the packages
+    actually installed.
     """
     PROVIDERS.append(Provider(
         me,
         partial(is_installed, me),
         partial(install, me),
-        partial(remove, me)))
+        partial(remove, me),
+        partial(install_all, me) if install_all is not None else None))
     return me
 
 
@@ -142,6 +156,38 @@ class Provider:
     is_installed: IsInstalledCallback
     install: InstallCallback
     remove: RemoveCallback
+    install_all: Optional[InstallAllCallback] = None
+
+
+def _install_all(packages: List[Twig]) -> Optional[List[Twig]]:
+    """Installs several package twigs at once.
+
+    All packages are in the same batch, so they are managed by the same
+    provider, which can install several packages at once.
+
+    :param packages: The package twigs to install.
+
+    :return: the package twigs actually installed
+    """
+    return _provider(packages[0]).install_all(packages)
+
+
+def _batch_group(me: Twig) -> Optional[Provider]:
+    """Determines the batch of a package twig.
+
+    Packages are only installed together if they are managed by the same
+    provider, and that provider can install several packages at once.
+
+    :param me: The package twig.
+
+    :return: the provider, or ``None`` if the package cannot be installed
+    along with other packages
+    """
+    try:
+        provider = _provider(me)
+    except StopIteration:
+        return None
+    return provider if provider.install_all is not None else None
 
 
 def _provider(me: Twig) -> Twig:
@@ -1,11 +1,32 @@
 """Systemd user units.
 """
 
-import os
+import sys
 
-from typing import Sequence
+from pathlib import Path
+from typing import Dict, Sequence
 
-from .. import TWIGS, Twig, twig
+from nest import ROOT, directories
+from .. import TWIGS, NestException, Twig, shared, twig
+
+
+#: The directory containing user units, relative to the user files of a twig.
+UNIT_PATH = Path('.config') / 'systemd' / 'user'
+
+#: Units generated from templates in this twig, since they must refer to the
+#: nest root.
+TEMPLATES = ('nest-update-check.service',)
+
+#: The unit file states for which ``systemctl is-enabled`` succeeds.
+ENABLED_STATES = {
+    'alias',
+    'enabled',
+    'enabled-runtime',
+    'generated',
+    'indirect',
+    'static',
+    'transient',
+}
 
 
 @twig()
@@ -21,25 +42,45 @@ def is_enabled(me: Twig) -> bool:
 
 @main.completer
 def complete(me: Twig):
-    for unit in (
-            unit
-            for unit in units()
-            if not enabled(me, unit)):
-        enable(me, unit)
+    for unit in TEMPLATES:
+        me.template(
+            Path(__file__).parent / '{}.template'.format(unit),
+            directories.HOME / UNIT_PATH / unit,
+            root=ROOT.absolute(),
+            python=sys.executable)
+    missing = [unit for unit in sorted(units()) if not enabled(me, unit)]
+
+    # Timers are started right away, since they would otherwise only start
+    # with the next login
+    enable(me, *(unit for unit in missing if not unit.endswith('.timer')))
+    enable(me, *(unit for unit in missing if unit.endswith('.timer')), now=True)
+
+
+@main.remover
+def remove(me: Twig):
+    # This twig is no longer enabled, so its own units are not listed by
+    # units()
+    disable(me, *sorted(
+        {p.name for p in me.user_files if p.parent == UNIT_PATH}
+        | set(TEMPLATES)))
+    for unit in TEMPLATES:
+        me.unlink(directories.HOME / UNIT_PATH / unit)
 
 
 def units() -> Sequence[str]:
     """Lists the names of all user units.
 
+    The units are read from the file lists of the enabled twigs, and
+    include the units generated from templates.
+
     :return: a list of unit names, including extension
     """
     return {
         p.name
         for t in TWIGS
-        if t.enabled and (
-            t.user_source / '.config' / 'systemd' / 'user').is_dir()
-        for p in (t.user_source / '.config' / 'systemd' / 'user').iterdir()
-        if p.is_file()}
+        if t.enabled
+        for p in t.user_files
+        if p.parent == UNIT_PATH} | set(TEMPLATES)
 
 
 def enabled(me: Twig, unit: str) -> bool:
@@ -53,18 +94,71 @@ def enabled(me: Twig, unit: str) -> bool:
 
     :return: whether the unit is enabled
     """
-    return me.run(
-        'systemctl', '--user', 'is-enabled', unit,
-        check=True,
-        silent=True)
+    return _states(me).get(unit) in ENABLED_STATES
+
 
+def enable(me: Twig, *units: str, now: bool=False):
+    """Enables user units.
 
-def enable(me: Twig, unit: str):
-    """Enables a user unit.
+    All units are enabled with a single command, after which the manager
+    configuration is reloaded.
 
     :param me: The currently handled twig.
 
-    :param unit: The unit name.
+    :param units: The unit names.
+
+    :param now: Whether to also start the units.
+    """
+    if units:
+        me.run(
+            'systemctl', '--user', 'enable', *(('--now',) if now else ()),
+            *units)
+        me.run(
+            'systemctl', '--user', 'daemon-reload')
+        _states.cache_clear()
+
+
+def disable(me: Twig, *units: str):
+    """Disables and stops user units.
+
+    All units are disabled with a single command, after which the manager
+    configuration is reloaded.
+
+    :param me: The currently handled twig.
+
+    :param units: The unit names.
+    """
+    if units:
+        me.run(
+            'systemctl', '--user', 'disable', '--now', *units,
+            check=True)
+        me.run(
+            'systemctl', '--user', 'daemon-reload',
+            check=True)
+        _states.cache_clear()
+
+
+@shared
+def _states(me: Twig) -> Dict[str, str]:
+    """Lists the states of all user unit files of the enabled twigs.
+
+    :param me: The currently handled twig.
+
+    :return: a mapping from unit name to unit file state
     """
-    return me.run(
-        'systemctl', '--user', 'enable', unit)
+    names = sorted(units())
+    if not names:
+        return {}
+    try:
+        return {
+            unit: state
+            for (unit, state, *_) in (
+                line.split()
+                for line in me.run(
+                    'systemctl', '--user', 'list-unit-files',
+                    '--no-legend', '--no-pager', *names,
+                    capture=True,
+                    interactive=False).splitlines()
+                if len(line.split()) >= 2)}
+    except (FileNotFoundError, NestException):
+        return {}